@@ -1,9 +1,31 @@
-from flask import Flask, request, jsonify
+"""AI service API
+
+Importing this module opens no connections: the database pool, the SQLite
+embedding and feedback caches and the OpenAI client are created on first
+use in each process, so it is safe to import before a fork (gunicorn
+--preload). Serve it through the application factory, for example with a
+prefork server:
+
+    gunicorn -w 4 -k gthread --threads 16 -b 0.0.0.0:5001 'app:create_app()'
+
+Each open /api/ranking-progress stream holds a worker thread, so use a
+threaded (or async) worker class rather than the default sync one.
+
+`python app.py` runs the development server with embedded ranking workers.
+"""
+import time
+
+# Reference point for the import and time-to-first-request measurements
+startup_started = time.perf_counter()
+
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 import threading
-import time
 import json
+import base64
+import hashlib
 from datetime import datetime
+from functools import partial
 import sys
 import os
 
@@ -11,7 +33,24 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
 from config.database import db
-from services.ai_service import AIService
+from services.ai_service import AIService, feedback_prompt_variant
+from services.candidate_loader import CandidateLoader
+from services.feedback_cache import FeedbackCache, requirements_hash
+from services.feedback_workers import FeedbackWorkerPool, RateLimiter
+from services.job_index import JobMatcher, JobVectorIndex
+from services.metrics import (
+    CANDIDATES_SCORED, CONTENT_TYPE as METRICS_CONTENT_TYPE, HTTP_REQUEST_SECONDS, HTTP_REQUESTS,
+    RANKING_RUNS, RunTimer, registry as metrics_registry, stage
+)
+from services.progress_broker import ProgressBroker
+from services.ranking_index import JobRankingIndexCache
+from services.ranking_queue import JobNotFound, RankingQueue
+from services.ranking_writer import ProgressReporter, RankingWriter
+from services.rankings_cache import RankingsCache
+from services.rankings_export import FORMATS as EXPORT_FORMATS, error_line, select_columns, stream_rankings
+from services.scoring_engine import JobProfileCache, ScoringEngine
+from services.skill_vectors import EmbeddingUnavailable
+from services.skill_vocabulary import SkillVocabulary
 
 app = Flask(__name__)
 CORS(app, origins=['http://localhost:3000'])
@@ -19,8 +58,192 @@ CORS(app, origins=['http://localhost:3000'])
 # Initialize AI service
 ai_service = AIService()
 
-# Global variable for tracking processing status
-processing_status = {}
+# Global skill vocabulary: normalized names and aliases interned to integer IDs
+skill_vocabulary = SkillVocabulary(aliases=SkillVocabulary.load_aliases(os.getenv('SKILL_ALIASES_PATH')))
+
+# Vectorized scoring of whole chunks of candidates against a compiled job profile
+scoring_engine = ScoringEngine(ai_service, skill_vocabulary)
+
+# Compiled job profiles for synchronous single-application scoring
+job_profiles = JobProfileCache(
+    scoring_engine,
+    lambda job_id: get_job_data(job_id),
+    ttl_seconds=int(os.getenv('JOB_PROFILE_CACHE_TTL', '60'))
+)
+
+# Reverse matching: open jobs indexed by requirement embeddings and skills
+job_matcher = JobMatcher(
+    db,
+    ai_service,
+    scoring_engine,
+    index=JobVectorIndex(
+        partitions=int(os.getenv('JOB_INDEX_PARTITIONS', '0')),
+        probes=int(os.getenv('JOB_INDEX_PROBES', '4'))
+    ),
+    refresh_interval=int(os.getenv('JOB_INDEX_REFRESH_SECONDS', '30')),
+    reconcile_interval=int(os.getenv('JOB_INDEX_RECONCILE_SECONDS', '300'))
+)
+
+# Bulk loader for candidate skills, education and experience
+candidate_loader = CandidateLoader(db, chunk_size=int(os.getenv('CANDIDATE_CHUNK_SIZE', '500')))
+
+# Shared worker pool for LLM feedback, rate limited to the provider quota
+feedback_pool = FeedbackWorkerPool(
+    ai_service,
+    max_workers=int(os.getenv('FEEDBACK_WORKERS', '4')),
+    rate_limiter=RateLimiter(
+        requests_per_minute=int(os.getenv('OPENAI_REQUESTS_PER_MINUTE', '500')),
+        tokens_per_minute=int(os.getenv('OPENAI_TOKENS_PER_MINUTE', '200000'))
+    ),
+    max_retries=int(os.getenv('FEEDBACK_MAX_RETRIES', '5'))
+)
+
+# Candidates of one job sharing a feedback request (1 = one request per candidate)
+feedback_batch_size = int(os.getenv('FEEDBACK_BATCH_SIZE', '5'))
+
+# Generated feedback keyed by resume hash, job requirements and score bucket
+feedback_cache = FeedbackCache(
+    path=os.getenv('FEEDBACK_CACHE_PATH', os.path.join(os.path.dirname(__file__), 'cache', 'feedback.sqlite3')),
+    ttl_seconds=int(os.getenv('FEEDBACK_CACHE_TTL_HOURS', '168')) * 3600,
+    max_entries=int(os.getenv('FEEDBACK_CACHE_SIZE', '50000'))
+)
+
+# Rows buffered per bulk write of rankings and feedback
+write_batch_size = int(os.getenv('RANKING_WRITE_BATCH_SIZE', '200'))
+
+# In-memory per-job leaderboards behind GET /api/rankings/<job_id>
+rankings_cache = RankingsCache(
+    db,
+    revalidate_interval=float(os.getenv('RANKINGS_CACHE_REVALIDATE_SECONDS', '5')),
+    max_jobs=int(os.getenv('RANKINGS_CACHE_JOBS', '128'))
+)
+
+# Jobs' score orderings kept between ranking runs for incremental re-ranking
+ranking_indexes = JobRankingIndexCache(db, max_jobs=int(os.getenv('RANKING_INDEX_CACHE_JOBS', '64')))
+
+# Each export holds its own database connection for the whole download
+export_slots = threading.BoundedSemaphore(int(os.getenv('RANKINGS_EXPORT_MAX_CONCURRENT', '4')))
+
+# Live ranking status for polling and Server-Sent Events. Embedded worker
+# processes publish over progress_channel; the database only receives
+# progress checkpoints, which is what streams follow for standalone workers.
+progress_broker = ProgressBroker(ttl_seconds=float(os.getenv('RANKING_STATUS_CACHE_TTL', '10')))
+progress_channel = None
+progress_checkpoint_seconds = float(os.getenv('PROGRESS_CHECKPOINT_SECONDS', '30'))
+progress_checkpoint_step = int(os.getenv('PROGRESS_CHECKPOINT_STEP', '25'))
+
+# Durable ranking queue on processing_jobs, drained by worker.py processes
+ranking_queue = RankingQueue(
+    db,
+    stale_after=int(os.getenv('RANKING_STALE_AFTER_SECONDS', '120')),
+    max_attempts=int(os.getenv('RANKING_MAX_ATTEMPTS', '3'))
+)
+
+# Seconds between checks whether a running ranking was asked to stop
+cancel_check_interval = float(os.getenv('RANKING_CANCEL_CHECK_SECONDS', '2'))
+
+@metrics_registry.collector
+def collect_service_stats():
+    """Cache, connection pool and progress broker stats, read at scrape time"""
+    caches = {
+        'embedding': ai_service.embedding_cache.stats(),
+        'feedback': feedback_cache.stats(),
+        'rankings': rankings_cache.stats(),
+        'job_profile': job_profiles.stats(),
+        'ranking_index': ranking_indexes.stats()
+    }
+    hits = {
+        ('embedding_memory',): caches['embedding']['memory_hits'],
+        ('embedding_disk',): caches['embedding']['disk_hits'],
+        ('feedback',): caches['feedback']['hits'],
+        ('rankings',): caches['rankings']['hits'] + caches['rankings']['revalidations'],
+        ('job_profile',): caches['job_profile']['hits'],
+        ('ranking_index',): caches['ranking_index']['hits']
+    }
+    misses = {
+        ('embedding',): caches['embedding']['misses'],
+        ('feedback',): caches['feedback']['misses'],
+        ('rankings',): caches['rankings']['loads'],
+        ('job_profile',): caches['job_profile']['misses'],
+        ('ranking_index',): caches['ranking_index']['loads']
+    }
+    broker = progress_broker.stats()
+    collected = [
+        ('ai_service_cache_hits_total', 'counter', 'Cache lookups served from cache', ['cache'], hits),
+        ('ai_service_cache_misses_total', 'counter', 'Cache lookups that had to compute or load', ['cache'], misses),
+        ('ai_service_progress_subscribers', 'gauge', 'Open ranking progress streams', [],
+         {(): broker['subscribers']}),
+        ('ai_service_startup_seconds', 'gauge', 'Seconds from module import to each startup milestone', ['phase'],
+         {(phase,): seconds for phase, seconds in startup_timings.items()})
+    ]
+    
+    # No pool until the first query
+    pool = db.stats()
+    if pool:
+        collected += [
+            ('ai_service_db_pool_connections', 'gauge', 'Database pool connections', ['state'],
+             {('open',): pool['open'], ('idle',): pool['idle']}),
+            ('ai_service_db_pool_checkouts_total', 'counter', 'Connections checked out of the pool', [],
+             {(): pool['checkouts']}),
+            ('ai_service_db_pool_waits_total', 'counter', 'Checkouts that waited for a free connection', [],
+             {(): pool['waits']}),
+            ('ai_service_db_pool_wait_seconds_total', 'counter', 'Time spent waiting for pool connections', [],
+             {(): pool['total_wait_seconds']}),
+            ('ai_service_db_pool_timeouts_total', 'counter', 'Checkouts that timed out', [], {(): pool['timeouts']})
+        ]
+    return collected
+
+def prewarm():
+    """Load what the first requests would otherwise wait for; failures are logged, not fatal
+
+    Opens the database pool, imports the OpenAI client and loads the
+    published jobs into the recommendation index. If MySQL is briefly
+    unavailable the service still starts and connects on first use.
+    """
+    started = time.perf_counter()
+    steps = (
+        ('database', db.connect),
+        ('openai', lambda: ai_service.client),
+        ('job_index', lambda: job_matcher.refresh(force=True))
+    )
+    for name, warm in steps:
+        step_started = time.perf_counter()
+        try:
+            warm()
+            print(f"🔥 Prewarmed {name} in {time.perf_counter() - step_started:.2f}s")
+        except Exception as e:
+            print(f"⚠️ Prewarming {name} failed, it will load on first use: {e}")
+    startup_timings['prewarm'] = time.perf_counter() - started
+
+def create_app(prewarm_caches=None):
+    """Application factory for WSGI servers: `gunicorn 'app:create_app()'`
+
+    Prewarms when `prewarm_caches` is true, or by default when APP_PREWARM=1.
+    With gunicorn --preload, leave prewarming to the workers (no --preload,
+    or a post_fork hook) so database connections are not opened in the
+    master; a pool inherited across fork is discarded anyway.
+    """
+    if prewarm_caches is None:
+        prewarm_caches = os.getenv('APP_PREWARM', '0') == '1'
+    if prewarm_caches:
+        prewarm()
+    return app
+
+@app.before_request
+def start_request_timer():
+    request.metrics_started = time.perf_counter()
+    if 'first_request' not in startup_timings:
+        startup_timings['first_request'] = request.metrics_started - startup_started
+        print(f"⚡ First request {startup_timings['first_request']:.2f}s after import started")
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    HTTP_REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    started = getattr(request, 'metrics_started', None)
+    if started is not None:
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+    return response
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -29,9 +252,15 @@ def health_check():
         'success': True,
         'message': 'AI Service is running',
         'timestamp': datetime.now().isoformat(),
-        'version': '1.0.0'
+        'version': '1.0.0',
+        'startup': {phase: round(seconds, 4) for phase, seconds in startup_timings.items()}
     })
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics for this process and its embedded ranking workers"""
+    return Response(metrics_registry.render(), content_type=METRICS_CONTENT_TYPE)
+
 @app.route('/api/test-connection', methods=['GET'])
 def test_connection():
     """Test OpenAI API connection"""
@@ -55,56 +284,282 @@ def test_connection():
 @app.route('/api/rank-candidates', methods=['POST'])
 def rank_candidates():
     """Rank candidates for a specific job using AI"""
+    data = request.get_json(silent=True) or {}
+    
+    if not data.get('job_id'):
+        return jsonify({
+            'success': False,
+            'message': 'Job ID is required'
+        }), 400
+    
+    try:
+        job_id = int(data['job_id'])
+        priority = int(data.get('priority', 0))
+    except (TypeError, ValueError):
+        return jsonify({
+            'success': False,
+            'message': 'Job ID and priority must be integers'
+        }), 400
+    
+    try:
+        # Queue the run; a worker process picks it up
+        processing_id = ranking_queue.enqueue(job_id, priority)
+        
+        if processing_id is None:
+            return jsonify({
+                'success': False,
+                'message': 'Ranking is already in progress for this job'
+            }), 400
+        
+        publish_progress(job_id, queued_status())
+        
+        return jsonify({
+            'success': True,
+            'message': 'Ranking process queued',
+            'job_id': job_id,
+            'processing_id': processing_id
+        })
+        
+    except JobNotFound:
+        return jsonify({
+            'success': False,
+            'message': 'Job not found'
+        }), 404
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Failed to start ranking: {str(e)}'
+        }), 500
+
+@app.route('/api/rank-candidates/batch', methods=['POST'])
+def rank_candidates_batch():
+    """Rank candidates for several jobs; workers rank them together"""
+    data = request.get_json(silent=True) or {}
+    job_ids = data.get('job_ids') or []
+    
+    if not isinstance(job_ids, list) or not job_ids:
+        return jsonify({
+            'success': False,
+            'message': 'A list of job IDs is required'
+        }), 400
+    
+    try:
+        job_ids = [int(job_id) for job_id in job_ids]
+        priority = int(data.get('priority', 0))
+    except (TypeError, ValueError):
+        return jsonify({
+            'success': False,
+            'message': 'Job IDs and priority must be integers'
+        }), 400
+    
+    try:
+        result = ranking_queue.enqueue_many(job_ids, priority)
+        for job_id in result['queued']:
+            publish_progress(job_id, queued_status())
+        
+        return jsonify({
+            'success': True,
+            'message': f"{len(result['queued'])} ranking process(es) queued",
+            'processing_ids': result['queued'],
+            'already_in_progress': result['active'],
+            'not_found': result['missing']
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Failed to start ranking: {str(e)}'
+        }), 500
+
+@app.route('/api/ranking-cancel/<int:job_id>', methods=['POST'])
+def cancel_ranking(job_id):
+    """Cancel a job's queued ranking or stop its running one after the current chunk"""
+    try:
+        result = ranking_queue.request_cancel(job_id)
+        
+        if result['cancelled']:
+            publish_progress(job_id, {
+                'status': 'cancelled',
+                'error_message': 'Cancelled by request',
+                'completed_at': datetime.now()
+            })
+            return jsonify({
+                'success': True,
+                'message': 'Queued ranking cancelled',
+                'job_id': job_id,
+                'status': 'cancelled'
+            })
+        
+        if result['cancelling']:
+            return jsonify({
+                'success': True,
+                'message': 'Ranking will stop after the current batch',
+                'job_id': job_id,
+                'status': 'cancelling'
+            }), 202
+        
+        return jsonify({
+            'success': False,
+            'message': 'No active ranking process found for this job'
+        }), 404
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Failed to cancel ranking: {str(e)}'
+        }), 500
+
+@app.route('/api/score-application', methods=['POST'])
+def score_application():
+    """Score one application synchronously, without generating feedback"""
     try:
-        data = request.get_json()
-        job_id = data.get('job_id')
+        started = time.perf_counter()
+        data = request.get_json(silent=True) or {}
         
-        if not job_id:
+        if not data.get('application_id'):
             return jsonify({
                 'success': False,
-                'message': 'Job ID is required'
+                'message': 'Application ID is required'
             }), 400
         
-        # Check if already processing
-        if job_id in processing_status and processing_status[job_id]['status'] in ['queued', 'processing']:
+        try:
+            application_id = int(data['application_id'])
+        except (TypeError, ValueError):
             return jsonify({
                 'success': False,
-                'message': 'Ranking is already in progress for this job'
+                'message': 'Application ID must be an integer'
             }), 400
         
-        # Start processing in background
-        thread = threading.Thread(target=process_ranking, args=(job_id,))
-        thread.daemon = True
-        thread.start()
+        application = db.execute_query("""
+            SELECT id, job_id FROM applications WHERE id = %s
+        """, (application_id,))
+        
+        if not application:
+            return jsonify({
+                'success': False,
+                'message': 'Application not found'
+            }), 404
+        
+        job_id = application[0]['job_id']
+        profile = job_profiles.get(job_id)
+        
+        if profile is None:
+            return jsonify({
+                'success': False,
+                'message': 'Job not found'
+            }), 404
+        
+        # Skills not embedded yet are matched with local embeddings rather
+        # than waiting on the embedding API
+        candidate_data = get_candidate_data(application_id)
+        skill_vectors = ai_service.interactive_skill_vectors(
+            [skill.get('skill_name', '') for skill in candidate_data.get('skills') or []] + profile.required_skills
+        )
+        batch_scores = scoring_engine.score_batch(profile, [candidate_data], skill_vectors=skill_vectors)
+        scores = {name: round(float(values[0]), 2) for name, values in batch_scores.items()}
         
         return jsonify({
             'success': True,
-            'message': 'Ranking process started',
-            'job_id': job_id
+            'data': {
+                'application_id': application_id,
+                'job_id': job_id,
+                **scores,
+                'embedding_backend': skill_vectors.name,
+                'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)
+            }
         })
         
     except Exception as e:
         return jsonify({
             'success': False,
-            'message': f'Failed to start ranking: {str(e)}'
+            'message': f'Failed to score application: {str(e)}'
+        }), 500
+
+@app.route('/api/recommend-jobs', methods=['GET'])
+def recommend_jobs():
+    """Recommend the best-fit open jobs for an application or candidate"""
+    try:
+        application_id = request.args.get('application_id', type=int)
+        candidate_id = request.args.get('candidate_id', type=int)
+        k = min(max(request.args.get('k', 5, type=int), 1), 50)
+        
+        if not application_id and not candidate_id:
+            return jsonify({
+                'success': False,
+                'message': 'Application ID or candidate ID is required'
+            }), 400
+        
+        if application_id:
+            application = db.execute_query("""
+                SELECT id, candidate_id FROM applications WHERE id = %s
+            """, (application_id,))
+        else:
+            # A candidate's most recent application carries their latest resume
+            application = db.execute_query("""
+                SELECT id, candidate_id FROM applications
+                WHERE candidate_id = %s
+                ORDER BY applied_at DESC, id DESC
+                LIMIT 1
+            """, (candidate_id,))
+        
+        if not application:
+            return jsonify({
+                'success': False,
+                'message': 'Application not found'
+            }), 404
+        
+        application_id = application[0]['id']
+        candidate_id = application[0]['candidate_id']
+        applied = db.execute_query("""
+            SELECT job_id FROM applications WHERE candidate_id = %s
+        """, (candidate_id,))
+        
+        recommendations = job_matcher.recommend(
+            get_candidate_data(application_id),
+            k=k,
+            exclude={row['job_id'] for row in applied}
+        )
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'application_id': application_id,
+                'candidate_id': candidate_id,
+                'jobs': recommendations
+            }
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Failed to recommend jobs: {str(e)}'
+        }), 500
+
+@app.route('/api/job-index/<int:job_id>', methods=['POST'])
+def refresh_job_index(job_id):
+    """Re-index one job right away, e.g. after it was published or closed"""
+    try:
+        indexed = job_matcher.sync_job(job_id)
+        
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'indexed': indexed
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Failed to update job index: {str(e)}'
         }), 500
 
 @app.route('/api/ranking-status/<int:job_id>', methods=['GET'])
 def get_ranking_status(job_id):
-    """Get ranking status for a specific job"""
+    """Get ranking status for a specific job, from the progress cache when fresh"""
     try:
-        # Get status from database
-        query = """
-        SELECT status, progress, total_candidates, error_message, started_at, completed_at
-        FROM processing_jobs 
-        WHERE job_id = %s 
-        ORDER BY created_at DESC 
-        LIMIT 1
-        """
-        result = db.execute_query(query, (job_id,))
+        status_data = get_cached_ranking_status(job_id)
         
-        if result:
-            status_data = result[0]
+        if status_data:
             return jsonify({
                 'success': True,
                 'data': status_data
@@ -121,235 +576,839 @@ def get_ranking_status(job_id):
             'message': f'Failed to get ranking status: {str(e)}'
         }), 500
 
-def process_ranking(job_id):
-    """Process ranking for all candidates of a job"""
+@app.route('/api/ranking-progress/<int:job_id>', methods=['GET'])
+def stream_ranking_progress(job_id):
+    """Stream ranking status updates for a job as Server-Sent Events"""
     try:
-        # Update processing status to processing
-        processing_status[job_id] = {
-            'status': 'processing',
-            'progress': 0,
-            'total_candidates': 0,
-            'started_at': datetime.now()
-        }
+        status_data = get_cached_ranking_status(job_id)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Failed to get ranking status: {str(e)}'
+        }), 500
+    
+    if not status_data:
+        return jsonify({
+            'success': False,
+            'message': 'No ranking process found for this job'
+        }), 404
+    
+    events = progress_broker.stream(
+        job_id, status_data, app.json.dumps,
+        keepalive=float(os.getenv('PROGRESS_KEEPALIVE_SECONDS', '15')),
+        reload=load_ranking_status
+    )
+    return Response(events, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/api/rankings/<int:job_id>', methods=['GET'])
+def get_rankings(job_id):
+    """Page through a job's rankings, best first
+    
+    Query parameters: `top` (page size), `cursor` (next_cursor of the previous
+    page), `min_score` and `max_score`. Responses carry an ETag; a matching
+    If-None-Match gets 304 Not Modified.
+    """
+    try:
+        top = min(max(request.args.get('top', 50, type=int), 1), 500)
+        min_score = request.args.get('min_score', type=float)
+        max_score = request.args.get('max_score', type=float)
+        cursor = request.args.get('cursor')
         
-        # Update database
-        db.execute_query("""
-            INSERT INTO processing_jobs (job_id, status, started_at)
-            VALUES (%s, 'processing', %s)
-            ON DUPLICATE KEY UPDATE 
-            status = 'processing', 
-            started_at = %s,
-            progress = 0
-        """, (job_id, datetime.now(), datetime.now()))
-        
-        # Get job details
-        job_query = """
-        SELECT title, required_skills, required_education, required_experience
-        FROM jobs WHERE id = %s
-        """
-        job_result = db.execute_query(job_query, (job_id,))
-        
-        if not job_result:
-            raise Exception('Job not found')
-        
-        job_data = job_result[0]
-        job_data['required_skills'] = json.loads(job_data['required_skills'])
-        job_data['required_education'] = json.loads(job_data['required_education'])
-        job_data['required_experience'] = json.loads(job_data['required_experience'])
-        
-        # Get all applications for this job
-        apps_query = """
-        SELECT a.id, a.candidate_id, u.first_name, u.last_name, u.email
-        FROM applications a
-        JOIN users u ON a.candidate_id = u.id
-        WHERE a.job_id = %s AND a.status = 'pending'
-        """
-        applications = db.execute_query(apps_query, (job_id,))
-        
-        total_candidates = len(applications)
-        
-        # Update total candidates
-        db.execute_query("""
-            UPDATE processing_jobs 
-            SET total_candidates = %s 
-            WHERE job_id = %s AND status = 'processing'
-        """, (total_candidates, job_id))
+        try:
+            after = decode_rankings_cursor(cursor) if cursor else None
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'message': 'Invalid cursor'
+            }), 400
         
-        rankings = []
+        rankings = rankings_cache.get(job_id)
         
-        for i, application in enumerate(applications):
-            try:
-                # Get candidate details
-                candidate_data = get_candidate_data(application['id'])
-                
-                # Calculate scores
-                skill_score = ai_service.calculate_skill_match(
-                    candidate_data['skills'], 
-                    job_data['required_skills']
-                )
-                
-                education_score = ai_service.calculate_education_match(
-                    candidate_data['education'], 
-                    job_data['required_education']
-                )
-                
-                experience_score = ai_service.calculate_experience_match(
-                    candidate_data['experience'], 
-                    job_data['required_experience']
-                )
-                
-                # Calculate total score (40% skills, 30% education, 30% experience)
-                total_score = (skill_score * 0.4) + (education_score * 0.3) + (experience_score * 0.3)
-                
-                scores = {
-                    'skill_score': skill_score,
-                    'education_score': education_score,
-                    'experience_score': experience_score,
-                    'total_score': total_score
-                }
-                
-                # Generate AI feedback
-                feedback = ai_service.generate_feedback(candidate_data, job_data, scores)
-                
-                # Store ranking
-                ranking_query = """
-                INSERT INTO rankings 
-                (job_id, application_id, skill_score, education_score, experience_score, total_score, rank_position, score_breakdown)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                ON DUPLICATE KEY UPDATE
-                skill_score = VALUES(skill_score),
-                education_score = VALUES(education_score),
-                experience_score = VALUES(experience_score),
-                total_score = VALUES(total_score),
-                score_breakdown = VALUES(score_breakdown)
-                """
-                db.execute_query(ranking_query, (
-                    job_id, 
-                    application['id'], 
-                    skill_score, 
-                    education_score, 
-                    experience_score, 
-                    total_score, 
-                    0,  # Will be updated after sorting
-                    json.dumps(scores)
-                ))
-                
-                # Store feedback
-                feedback_query = """
-                INSERT INTO feedback 
-                (application_id, strengths, missing_skills, suggestions, overall_assessment)
-                VALUES (%s, %s, %s, %s, %s)
-                ON DUPLICATE KEY UPDATE
-                strengths = VALUES(strengths),
-                missing_skills = VALUES(missing_skills),
-                suggestions = VALUES(suggestions),
-                overall_assessment = VALUES(overall_assessment)
-                """
-                db.execute_query(feedback_query, (
-                    application['id'],
-                    feedback['strengths'],
-                    feedback['missing_skills'],
-                    feedback['suggestions'],
-                    feedback['overall_assessment']
-                ))
-                
-                rankings.append({
-                    'application_id': application['id'],
-                    'total_score': total_score
-                })
-                
-                # Update progress
-                progress = int(((i + 1) / total_candidates) * 100)
-                db.execute_query("""
-                    UPDATE processing_jobs 
-                    SET progress = %s 
-                    WHERE job_id = %s AND status = 'processing'
-                """, (progress, job_id))
-                
-                # Small delay to prevent overwhelming the API
-                time.sleep(0.5)
-                
-            except Exception as e:
-                print(f"Error processing application {application['id']}: {e}")
-                continue
+        etag = hashlib.sha1(
+            f"{rankings.version}:{top}:{cursor}:{min_score}:{max_score}".encode('utf-8')
+        ).hexdigest()
+        if request.if_none_match.contains(etag):
+            response = app.response_class(status=304)
+            response.set_etag(etag)
+            return response
         
-        # Update rankings with positions
-        rankings.sort(key=lambda x: x['total_score'], reverse=True)
-        for position, ranking in enumerate(rankings, 1):
-            db.execute_query("""
-                UPDATE rankings 
-                SET rank_position = %s 
-                WHERE job_id = %s AND application_id = %s
-            """, (position, job_id, ranking['application_id']))
+        page = rankings.page(top, after=after, min_score=min_score, max_score=max_score)
+        next_cursor = None
+        if len(page) == top:
+            next_cursor = encode_rankings_cursor(page[-1]['total_score'], page[-1]['application_id'])
         
-        # Update application statuses
-        db.execute_query("""
-            UPDATE applications 
-            SET status = 'ranked' 
-            WHERE job_id = %s AND status = 'pending'
-        """, (job_id,))
+        response = jsonify({
+            'success': True,
+            'data': {
+                'job_id': job_id,
+                'total': len(rankings.index),
+                'rankings': page,
+                'next_cursor': next_cursor
+            }
+        })
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
         
-        # Mark processing as completed
-        db.execute_query("""
-            UPDATE processing_jobs 
-            SET status = 'completed', completed_at = %s, progress = 100
-            WHERE job_id = %s AND status = 'processing'
-        """, (datetime.now(), job_id))
-        
-        processing_status[job_id] = {
-            'status': 'completed',
-            'progress': 100,
-            'total_candidates': total_candidates,
-            'completed_at': datetime.now()
-        }
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Failed to get rankings: {str(e)}'
+        }), 500
+
+@app.route('/api/rankings/<int:job_id>/export', methods=['GET'])
+def export_rankings(job_id):
+    """Stream all of a job's rankings with feedback and candidate identity, best first
+    
+    Query parameters: `format` (ndjson, the default, or csv), `columns`
+    (comma-separated subset, see services.rankings_export.EXPORT_COLUMNS)
+    and `gzip` (1 or 0; by default the response is gzipped when the client
+    accepts it). Rows are streamed from an unbuffered cursor as they are
+    read, so any job size exports in constant memory. An export that fails
+    midway ends with an error line (ndjson/csv) or a broken gzip trailer and
+    an aborted connection, never as a complete-looking file.
+    """
+    export_format = request.args.get('format', 'ndjson').lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({
+            'success': False,
+            'message': f"Unsupported format '{export_format}', use ndjson or csv"
+        }), 400
+    
+    try:
+        columns = select_columns(request.args.get('columns'))
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    
+    compress = request.args.get('gzip')
+    compress = compress == '1' if compress in ('0', '1') else 'gzip' in request.accept_encodings
+    
+    try:
+        if not db.execute_query("SELECT id FROM jobs WHERE id = %s", (job_id,)):
+            return jsonify({
+                'success': False,
+                'message': 'Job not found'
+            }), 404
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Failed to export rankings: {str(e)}'
+        }), 500
+    
+    if not export_slots.acquire(blocking=False):
+        return jsonify({
+            'success': False,
+            'message': 'Too many rankings exports in progress, try again shortly'
+        }), 503
+    
+    def body():
+        try:
+            yield from stream_rankings(
+                db, job_id, columns, export_format, compress=compress,
+                fetch_size=int(os.getenv('RANKINGS_EXPORT_FETCH_SIZE', '1000'))
+            )
+        except Exception as e:
+            # Headers are already sent: mark the file as incomplete, then let
+            # the server abort the connection instead of ending it cleanly
+            print(f"❌ Rankings export for job {job_id} failed: {e}")
+            if not compress:
+                yield error_line(export_format, str(e)).encode('utf-8')
+            raise
+    
+    headers = {
+        'Content-Disposition': f'attachment; filename="job-{job_id}-rankings.{export_format}"',
+        'Cache-Control': 'no-cache',
+        'Vary': 'Accept-Encoding'
+    }
+    if compress:
+        headers['Content-Encoding'] = 'gzip'
+    response = Response(body(), content_type=EXPORT_FORMATS[export_format], headers=headers)
+    response.call_on_close(export_slots.release)
+    return response
+
+@app.route('/api/feedback/<int:application_id>', methods=['GET'])
+def get_feedback(application_id):
+    """Get feedback for a ranked application, generating it on demand if missing"""
+    try:
+        result = db.execute_query("""
+            SELECT strengths, missing_skills, suggestions, overall_assessment, generated_at
+            FROM feedback WHERE application_id = %s
+        """, (application_id,))
         
-        print(f"✅ Ranking completed for job {job_id}. Processed {total_candidates} candidates.")
+        if result:
+            return jsonify({
+                'success': True,
+                'data': result[0]
+            })
         
-    except Exception as e:
-        print(f"❌ Ranking failed for job {job_id}: {e}")
+        ranking = db.execute_query("""
+            SELECT job_id FROM rankings WHERE application_id = %s
+        """, (application_id,))
         
-        # Mark processing as failed
+        if not ranking:
+            return jsonify({
+                'success': False,
+                'message': 'Application has not been ranked yet'
+            }), 404
+        
+        job_id = ranking[0]['job_id']
+        job_data = get_job_data(job_id)
+        scores = get_ranking_scores(job_id, [application_id])[application_id]
+        
+        key = feedback_cache_key(
+            get_resume_hashes([application_id]).get(application_id), job_data, scores, feedback_prompt_variant()
+        )
+        feedback = feedback_cache.get(key) if key else None
+        if feedback is None:
+            candidate_data = get_candidate_data(application_id)
+            feedback = feedback_pool.generate(candidate_data, job_data, scores)
+            remember_feedback(key, job_id, job_data, feedback)
+        store_feedback(application_id, feedback)
+        
+        return jsonify({
+            'success': True,
+            'data': feedback
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Failed to get feedback: {str(e)}'
+        }), 500
+
+@app.route('/api/feedback-cache/<int:job_id>', methods=['DELETE'])
+def invalidate_feedback_cache(job_id):
+    """Drop cached feedback for a job, e.g. after its requirements were edited"""
+    try:
+        removed = feedback_cache.invalidate_job(job_id)
+        job_profiles.invalidate(job_id)
+        return jsonify({
+            'success': True,
+            'message': 'Feedback cache invalidated',
+            'removed': removed
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Failed to invalidate feedback cache: {str(e)}'
+        }), 500
+
+def process_ranking(job_id, processing_id=None):
+    """Process ranking for all candidates of a job
+    
+    Only new or changed applications are scored; their scores are merged
+    into the job's existing ordering and only shifted rank positions are
+    written. Scores are stored and ranked first so recruiters see the final
+    ordering immediately; feedback is generated afterwards by
+    process_feedback in a separate background thread.
+    
+    Queue workers pass the processing_jobs row they claimed; direct callers
+    get a new row.
+    """
+    if processing_id is None:
+        processing_id = db.execute_query("""
+            INSERT INTO processing_jobs (job_id, status, started_at)
+            VALUES (%s, 'processing', %s)
+        """, (job_id, datetime.now()))
+    
+    process_ranking_batch([(job_id, processing_id)])
+
+def process_ranking_batch(runs):
+    """Process ranking for several jobs in one pass over their candidates
+    
+    `runs` is a list of (job_id, processing_id) pairs. Candidates who applied
+    to more than one of the jobs are loaded and parsed once and scored
+    against every job in the batch (see score_runs). Each job keeps its own
+    processing_jobs row, progress, rank positions and feedback stage; a job
+    that cannot be prepared fails alone.
+    
+    Rankings are committed in batches together with a processing_jobs
+    checkpoint, so a run that crashes resumes after its last committed batch
+    when it is requeued. Runs asked to stop through /api/ranking-cancel are
+    checked every few seconds and stop after the current chunk, keeping the
+    rankings they committed.
+    
+    A job whose rankings cannot be stored or merged fails alone; an error
+    that cannot be pinned on one job (e.g. loading shared candidate data)
+    requeues the batch's runs to resume from their checkpoints.
+    
+    Time spent per stage is summarized into each run's processing_jobs
+    timings column (stages of a batch are shared by its runs).
+    """
+    with RunTimer() as timer:
+        prepared = rank_batch(runs)
+    record_run_timings(prepared, timer)
+
+def rank_batch(runs):
+    """Score, store and finalize a batch of runs; returns the runs that were prepared"""
+    prepared = []
+    with stage('prepare'):
+        for job_id, processing_id in runs:
+            try:
+                prepared.append(start_ranking_run(job_id, processing_id))
+            except Exception as e:
+                fail_ranking_run(job_id, processing_id, e)
+    
+    if not prepared:
+        return prepared
+    
+    runs_by_job = {run['job_id']: run for run in prepared}
+    
+    def job_failed(job_id, error):
+        runs_by_job[job_id]['error'] = error
+    
+    try:
+        # Stage 1: score and store rankings in checkpointed batches, throttling progress writes
+        checkpoint = partial(record_checkpoint, {run['job_id']: run['processing_id'] for run in prepared})
+        cancellation = {'checked_at': time.monotonic()}
+        with RankingWriter(db, batch_size=write_batch_size, checkpoint=checkpoint, on_error=job_failed) as writer:
+            for run in score_runs(prepared, writer):
+                run['progress'].update(len(run['rankings']))
+                check_cancellations(prepared, cancellation)
+                if all(run['cancelled'] or run['error'] for run in prepared):
+                    break
+            
+            # Write only the rank positions that actually shifted
+            with stage('rank_merge'):
+                for run in prepared:
+                    if run['error']:
+                        continue
+                    try:
+                        index = run['index']
+                        for ranking in run['rankings']:
+                            index.upsert(ranking['application_id'], ranking['total_score'])
+                        writer.update_rank_positions(run['job_id'], index.shifted_positions(run['stored_positions']))
+                        index.mark_clean()
+                        ranking_indexes.put(index)
+                    except Exception as e:
+                        run['error'] = e
+                    rankings_cache.invalidate(run['job_id'])
+    except Exception as e:
+        # Not one job's fault (e.g. loading shared candidate data, or the
+        # embedding backend failing mid-run so the retry starts over on the
+        # fallback): the runs resume from their checkpoints
+        for run in prepared:
+            if run['error']:
+                fail_ranking_run(run['job_id'], run['processing_id'], run['error'])
+            else:
+                requeue_ranking_run(run, e)
+        return prepared
+    
+    with stage('finalize'):
+        for run in prepared:
+            try:
+                if run['error']:
+                    fail_ranking_run(run['job_id'], run['processing_id'], run['error'])
+                elif run['cancelled']:
+                    cancel_ranking_run(run)
+                else:
+                    finish_ranking_run(run)
+            except Exception as e:
+                fail_ranking_run(run['job_id'], run['processing_id'], e)
+    return prepared
+
+def record_run_timings(runs, timer):
+    """Store a batch's stage timings on each of its processing_jobs rows"""
+    if not runs:
+        return
+    summary = timer.summary()
+    candidates = sum(len(run['rankings']) for run in runs)
+    CANDIDATES_SCORED.inc(candidates)
+    
+    stages = ', '.join(f"{name}={value['seconds']:.2f}s" for name, value in summary['stages'].items())
+    print(f"⏱️ Ranked {candidates} candidates for {len(runs)} job(s) in {summary['total_seconds']:.2f}s ({stages})")
+    
+    try:
+        db.execute_many("""
+            UPDATE processing_jobs SET timings = %s WHERE id = %s
+        """, [
+            (json.dumps({**summary, 'batch_jobs': len(runs), 'candidates': len(run['rankings'])}), run['processing_id'])
+            for run in runs
+        ])
+    except Exception as e:
+        print(f"⚠️ Failed to store ranking timings: {e}")
+
+def start_ranking_run(job_id, processing_id):
+    """Load a job's requirements, the applications that need scoring and its current ordering"""
+    run_started_at = datetime.now()
+    job_data = get_job_data(job_id)
+    
+    if not job_data:
+        raise Exception('Job not found')
+    
+    # The whole run scores skills semantically with one embedding backend
+    skill_vectors = ai_service.semantic_skill_vectors()
+    
+    # Only new applications, changed resumes and rankings scored against
+    # older job requirements or another embedding backend need scoring
+    apps_query = """
+    SELECT a.id, a.candidate_id, a.resume_hash, u.first_name, u.last_name, u.email
+    FROM applications a
+    JOIN users u ON a.candidate_id = u.id
+    LEFT JOIN rankings r ON r.job_id = a.job_id AND r.application_id = a.id
+    WHERE a.job_id = %s
+      AND (r.id IS NULL
+           OR NOT (r.resume_hash <=> a.resume_hash)
+           OR NOT (r.requirements_hash <=> %s)
+           OR NOT (r.embedding_backend <=> %s))
+    """
+    # Rankings committed by an earlier attempt of this run are skipped, so a
+    # requeued run's progress counts only the applications still to score
+    applications = db.execute_query(apps_query, (job_id, job_data['requirements_hash'], skill_vectors.name))
+    total_candidates = len(applications)
+    
+    # Update total candidates
+    db.execute_query("""
+        UPDATE processing_jobs 
+        SET total_candidates = %s 
+        WHERE id = %s AND status = 'processing'
+    """, (total_candidates, processing_id))
+    
+    # The job's existing score ordering, merged with the new scores
+    index, stored_positions = ranking_indexes.take(job_id)
+    
+    publish_progress(job_id, {
+        'status': 'processing',
+        'progress': 0,
+        'total_candidates': total_candidates,
+        'error_message': None,
+        'started_at': run_started_at,
+        'completed_at': None
+    })
+    
+    return {
+        'job_id': job_id,
+        'processing_id': processing_id,
+        'started_at': run_started_at,
+        'job_data': job_data,
+        'skill_vectors': skill_vectors,
+        'applications': applications,
+        'rankings': [],
+        'cancelled': False,
+        'error': None,
+        'index': index,
+        'stored_positions': stored_positions,
+        'progress': ProgressReporter(
+            db, processing_id, total_candidates,
+            min_interval=progress_checkpoint_seconds,
+            min_step=progress_checkpoint_step,
+            publish=partial(publish_progress, job_id)
+        )
+    }
+
+def finish_ranking_run(run):
+    """Mark a scored run completed and start its feedback stage"""
+    job_id = run['job_id']
+    
+    # Update application statuses
+    db.execute_query("""
+        UPDATE applications 
+        SET status = 'ranked' 
+        WHERE job_id = %s AND status = 'pending'
+    """, (job_id,))
+    
+    # Mark processing as completed
+    completed_at = datetime.now()
+    db.execute_query("""
+        UPDATE processing_jobs 
+        SET status = 'completed', completed_at = %s, progress = 100
+        WHERE id = %s AND status = 'processing'
+    """, (completed_at, run['processing_id']))
+    publish_progress(job_id, {'status': 'completed', 'progress': 100, 'completed_at': completed_at})
+    RANKING_RUNS.inc(status='completed')
+    
+    print(f"✅ Ranking completed for job {job_id}. Processed {len(run['applications'])} candidates.")
+    
+    # Stage 2: generate feedback in the background, best candidates first.
+    # Selected from the database, so feedback an interrupted earlier run did
+    # not get to is picked up as well.
+    thread = threading.Thread(target=process_feedback, args=(job_id, get_pending_feedback_ids(job_id), run['started_at']))
+    thread.daemon = True
+    thread.start()
+
+def cancel_ranking_run(run):
+    """Mark a run stopped by request as cancelled, keeping the rankings it committed"""
+    job_id = run['job_id']
+    
+    # Applications ranked by any attempt of the run (or an earlier run) count as ranked
+    db.execute_query("""
+        UPDATE applications 
+        SET status = 'ranked' 
+        WHERE job_id = %s AND status = 'pending'
+          AND id IN (SELECT application_id FROM rankings WHERE job_id = %s)
+    """, (job_id, job_id))
+    
+    completed_at = datetime.now()
+    db.execute_query("""
+        UPDATE processing_jobs 
+        SET status = 'cancelled', completed_at = %s, error_message = 'Cancelled by request'
+        WHERE id = %s AND status = 'processing'
+    """, (completed_at, run['processing_id']))
+    publish_progress(job_id, {
+        'status': 'cancelled',
+        'error_message': 'Cancelled by request',
+        'completed_at': completed_at
+    })
+    RANKING_RUNS.inc(status='cancelled')
+    
+    print(f"🛑 Ranking cancelled for job {job_id} after {len(run['rankings'])} candidates.")
+
+def record_checkpoint(processing_ids, cursor, rankings):
+    """Count a flushed batch of rankings towards each run, in the batch's transaction"""
+    counts = {}
+    for params in rankings:
+        counts[params[0]] = counts.get(params[0], 0) + 1
+    cursor.executemany("""
+        UPDATE processing_jobs
+        SET processed_candidates = processed_candidates + %s, checkpoint_at = NOW()
+        WHERE id = %s
+    """, [(count, processing_ids[job_id]) for job_id, count in counts.items()])
+
+def check_cancellations(runs, state):
+    """Flag runs whose cancellation was requested, querying at most every few seconds"""
+    if time.monotonic() - state['checked_at'] < cancel_check_interval:
+        return
+    state['checked_at'] = time.monotonic()
+    cancelled = ranking_queue.cancelled([run['processing_id'] for run in runs if not run['cancelled']])
+    for run in runs:
+        if run['processing_id'] in cancelled:
+            run['cancelled'] = True
+
+def requeue_ranking_run(run, error):
+    """Return a run to the queue to be retried, failing it once it is out of attempts"""
+    job_id = run['job_id']
+    if not ranking_queue.requeue(run['processing_id'], str(error)):
+        fail_ranking_run(job_id, run['processing_id'], error)
+        return
+    print(f"♻️ Ranking for job {job_id} requeued: {error}")
+    publish_progress(job_id, {**queued_status(), 'error_message': str(error)})
+    RANKING_RUNS.inc(status='requeued')
+
+def fail_ranking_run(job_id, processing_id, error):
+    """Record a failed ranking run"""
+    print(f"❌ Ranking failed for job {job_id}: {error}")
+    
+    # Mark processing as failed
+    completed_at = datetime.now()
+    if processing_id is not None:
         db.execute_query("""
             UPDATE processing_jobs 
             SET status = 'failed', error_message = %s, completed_at = %s
-            WHERE job_id = %s AND status = 'processing'
-        """, (str(e), datetime.now(), job_id))
+            WHERE id = %s AND status = 'processing'
+        """, (str(error), completed_at, processing_id))
+    publish_progress(job_id, {'status': 'failed', 'error_message': str(error), 'completed_at': completed_at})
+    RANKING_RUNS.inc(status='failed')
+
+def process_feedback(job_id, application_ids, since):
+    """Generate feedback for ranked applications in rank order
+    
+    Applications that already received feedback after `since` (for example
+    on demand, while this stage was running) are skipped.
+    """
+    try:
+        job_data = get_job_data(job_id)
         
-        processing_status[job_id] = {
-            'status': 'failed',
-            'error_message': str(e),
-            'completed_at': datetime.now()
-        }
+        # Cached feedback from either prompt this stage can produce is reused
+        variants = [feedback_prompt_variant()]
+        if feedback_batch_size > 1:
+            variants.insert(0, feedback_prompt_variant(batched=True))
+        pending_hashes = {}
+        feedback_progress = {'pending': count_pending_feedback(job_id), 'published_at': time.monotonic()}
+        publish_progress(job_id, {'feedback_pending': feedback_progress['pending']})
+        
+        def feedback_written():
+            # Live countdown for status readers, throttled to one event per second
+            feedback_progress['pending'] = max(feedback_progress['pending'] - 1, 0)
+            if time.monotonic() - feedback_progress['published_at'] >= 1.0:
+                publish_progress(job_id, {'feedback_pending': feedback_progress['pending']})
+                feedback_progress['published_at'] = time.monotonic()
+        
+        def pending_feedback():
+            for chunk in candidate_loader.iter_chunks([{'id': application_id} for application_id in application_ids]):
+                chunk_ids = [application['id'] for application, _ in chunk]
+                fresh = get_fresh_feedback_ids(chunk_ids, since)
+                scores = get_ranking_scores(job_id, chunk_ids)
+                resume_hashes = get_resume_hashes(chunk_ids)
+                for application, candidate_data in chunk:
+                    application_id = application['id']
+                    if application_id in fresh or application_id not in scores:
+                        continue
+                    
+                    # Identical resume against unchanged requirements: skip the LLM
+                    resume_hash = resume_hashes.get(application_id)
+                    cached = cached_feedback(resume_hash, job_data, scores[application_id], variants)
+                    if cached is not None:
+                        writer.add_feedback(application_id, cached)
+                        feedback_written()
+                        continue
+                    
+                    pending_hashes[application_id] = (resume_hash, scores[application_id])
+                    yield application_id, candidate_data, scores[application_id]
+        
+        with RankingWriter(db, batch_size=write_batch_size) as writer:
+            for application_id, feedback, variant in feedback_pool.imap_unordered(
+                pending_feedback(), job_data, batch_size=feedback_batch_size
+            ):
+                writer.add_feedback(application_id, feedback)
+                resume_hash, application_scores = pending_hashes.pop(application_id)
+                key = feedback_cache_key(resume_hash, job_data, application_scores, variant)
+                remember_feedback(key, job_id, job_data, feedback)
+                feedback_written()
+        
+        publish_progress(job_id, {'feedback_pending': count_pending_feedback(job_id)})
+        print(f"✅ Feedback generated for job {job_id}.")
+        
+    except Exception as e:
+        print(f"❌ Feedback generation failed for job {job_id}: {e}")
 
-def get_candidate_data(application_id):
-    """Get complete candidate data for an application"""
-    # Get skills
-    skills_query = """
-    SELECT skill_name, proficiency_level, years_of_experience
-    FROM skills WHERE application_id = %s
+def publish_progress(job_id, fields):
+    """Send live status fields to the API process's progress broker"""
+    try:
+        if progress_channel is not None:
+            progress_channel.put_nowait((job_id, fields))
+        else:
+            progress_broker.publish(job_id, fields)
+    except Exception as e:
+        print(f"⚠️ Failed to publish progress for job {job_id}: {e}")
+
+def queued_status():
+    return {
+        'status': 'queued',
+        'progress': 0,
+        'total_candidates': 0,
+        'error_message': None,
+        'started_at': None,
+        'completed_at': None
+    }
+
+def load_ranking_status(job_id):
+    """Latest processing_jobs status for a job from the database, or None"""
+    query = """
+    SELECT status, progress, total_candidates, error_message, started_at, completed_at
+    FROM processing_jobs 
+    WHERE job_id = %s 
+    ORDER BY created_at DESC 
+    LIMIT 1
     """
-    skills = db.execute_query(skills_query, (application_id,))
+    result = db.execute_query(query, (job_id,))
     
-    # Get education
-    education_query = """
-    SELECT degree, field_of_study, institution, graduation_year, gpa
-    FROM education WHERE application_id = %s
+    if not result:
+        return None
+    status_data = result[0]
+    status_data['feedback_pending'] = count_pending_feedback(job_id)
+    return status_data
+
+def get_cached_ranking_status(job_id):
+    """Ranking status from the progress broker, loading it from the database when stale"""
+    status_data = progress_broker.get(job_id)
+    if status_data is None or 'feedback_pending' not in status_data:
+        status_data = load_ranking_status(job_id)
+        if status_data:
+            progress_broker.prime(job_id, status_data)
+    return status_data
+
+# A job's ranked applications whose feedback is missing or older than their ranking
+PENDING_FEEDBACK_FROM = """
+    FROM rankings r
+    LEFT JOIN feedback f ON f.application_id = r.application_id
+    WHERE r.job_id = %s AND (f.id IS NULL OR f.generated_at < r.ranked_at)
+"""
+
+def get_pending_feedback_ids(job_id):
+    """A job's ranked applications whose feedback is missing or older than their ranking, best first"""
+    rows = db.execute_query(f"""
+        SELECT r.application_id
+        {PENDING_FEEDBACK_FROM}
+        ORDER BY r.total_score DESC, r.application_id ASC
+    """, (job_id,))
+    return [row['application_id'] for row in rows]
+
+def count_pending_feedback(job_id):
+    """Number of a job's ranked applications whose feedback is missing or stale (see get_pending_feedback_ids)"""
+    return db.execute_query(f"""
+        SELECT COUNT(*) AS pending
+        {PENDING_FEEDBACK_FROM}
+    """, (job_id,))[0]['pending']
+
+def get_job_data(job_id):
+    """Get a job's requirements with JSON columns decoded"""
+    job_query = """
+    SELECT title, required_skills, required_education, required_experience
+    FROM jobs WHERE id = %s
     """
-    education = db.execute_query(education_query, (application_id,))
+    job_result = db.execute_query(job_query, (job_id,))
     
-    # Get experience
-    experience_query = """
-    SELECT job_title, company, duration_months, start_date, end_date, is_current, description
-    FROM experience WHERE application_id = %s
-    """
-    experience = db.execute_query(experience_query, (application_id,))
+    if not job_result:
+        return None
     
+    job_data = job_result[0]
+    job_data['required_skills'] = json.loads(job_data['required_skills'])
+    job_data['required_education'] = json.loads(job_data['required_education'])
+    job_data['required_experience'] = json.loads(job_data['required_experience'])
+    job_data['requirements_hash'] = requirements_hash(job_data)
+    return job_data
+
+def get_ranking_scores(job_id, application_ids):
+    """Get stored score dicts for a set of ranked applications"""
+    if not application_ids:
+        return {}
+    placeholders = ', '.join(['%s'] * len(application_ids))
+    rows = db.execute_query(f"""
+        SELECT application_id, skill_score, education_score, experience_score, total_score
+        FROM rankings
+        WHERE job_id = %s AND application_id IN ({placeholders})
+    """, (job_id, *application_ids))
     return {
-        'skills': skills,
-        'education': education,
-        'experience': experience
+        row['application_id']: {
+            'skill_score': float(row['skill_score']),
+            'education_score': float(row['education_score']),
+            'experience_score': float(row['experience_score']),
+            'total_score': float(row['total_score'])
+        }
+        for row in rows
     }
 
+def get_fresh_feedback_ids(application_ids, since):
+    """IDs of applications whose feedback was generated after `since`"""
+    if not application_ids:
+        return set()
+    placeholders = ', '.join(['%s'] * len(application_ids))
+    rows = db.execute_query(f"""
+        SELECT application_id FROM feedback
+        WHERE application_id IN ({placeholders}) AND generated_at >= %s
+    """, (*application_ids, since))
+    return {row['application_id'] for row in rows}
+
+def get_resume_hashes(application_ids):
+    """Map application IDs to their resume hashes"""
+    if not application_ids:
+        return {}
+    placeholders = ', '.join(['%s'] * len(application_ids))
+    rows = db.execute_query(f"""
+        SELECT id, resume_hash FROM applications WHERE id IN ({placeholders})
+    """, tuple(application_ids))
+    return {row['id']: row['resume_hash'] for row in rows}
+
+def feedback_cache_key(resume_hash, job_data, scores, prompt_variant):
+    """Feedback cache key for feedback from one prompt variant, or None when the resume hash is unknown"""
+    if not resume_hash:
+        return None
+    return feedback_cache.make_key(
+        resume_hash, job_data['requirements_hash'], scores, ai_service.model, prompt_variant
+    )
+
+def cached_feedback(resume_hash, job_data, scores, prompt_variants):
+    """Cached feedback from the first of `prompt_variants` that has an entry, or None"""
+    for prompt_variant in prompt_variants:
+        key = feedback_cache_key(resume_hash, job_data, scores, prompt_variant)
+        feedback = feedback_cache.get(key) if key else None
+        if feedback is not None:
+            return feedback
+    return None
+
+def remember_feedback(key, job_id, job_data, feedback):
+    """Cache generated feedback unless it is a canned fallback"""
+    if key and not ai_service.is_fallback_feedback(feedback):
+        feedback_cache.put(key, job_id, job_data['requirements_hash'], feedback)
+
+def store_feedback(application_id, feedback):
+    """Upsert generated feedback for an application"""
+    db.execute_query(RankingWriter.FEEDBACK_QUERY, RankingWriter.feedback_params(application_id, feedback))
+
+def score_runs(runs, writer):
+    """Score and store rankings for the applications of one or more ranking runs.
+    
+    Applications are grouped by candidate and resume hash, so a resume sent
+    to several of the jobs is loaded, parsed and embedded once. Distinct
+    resumes are loaded in chunks and each chunk is scored against every job
+    that received it before the next chunk is loaded, keeping the shared
+    candidate data hot. Rankings are buffered in `writer` and appended to
+    each run's `rankings`; a run is yielded after each chunk scored for it
+    so the caller can report progress.
+    """
+    # Each job's requirements are compiled once, with the run's embedding backend
+    profiles = {run['job_id']: scoring_engine.compile(run['job_data'], run['skill_vectors']) for run in runs}
+    
+    resumes = {}
+    for run in runs:
+        for application in run['applications']:
+            key = (application['candidate_id'], application.get('resume_hash') or application['id'])
+            resumes.setdefault(key, []).append((run, application))
+    
+    # One application per distinct resume stands in for the others when loading
+    representatives = [{'id': targets[0][1]['id'], 'key': key} for key, targets in resumes.items()]
+    
+    for chunk in candidate_loader.iter_chunks(representatives):
+        by_job = {}
+        for representative, candidate_data in chunk:
+            for run, application in resumes[representative['key']]:
+                if run['cancelled'] or run['error']:
+                    continue
+                by_job.setdefault(run['job_id'], (run, []))[1].append((application, candidate_data))
+        
+        for job_id, (run, scored) in by_job.items():
+            try:
+                with stage('score'):
+                    batch_scores = scoring_engine.score_batch(profiles[job_id], [candidate_data for _, candidate_data in scored])
+            except EmbeddingUnavailable:
+                raise
+            except Exception as e:
+                print(f"Error scoring applications {[application['id'] for application, _ in scored]}: {e}")
+                continue
+            
+            for position, (application, _) in enumerate(scored):
+                scores = {name: float(values[position]) for name, values in batch_scores.items()}
+                
+                # Store ranking
+                writer.add_ranking(
+                    job_id, application['id'], scores,
+                    resume_hash=application.get('resume_hash'),
+                    requirements_hash=run['job_data']['requirements_hash'],
+                    embedding_backend=run['skill_vectors'].name
+                )
+                
+                run['rankings'].append({
+                    'application_id': application['id'],
+                    'total_score': scores['total_score']
+                })
+            
+            yield run
+
+def encode_rankings_cursor(score, application_id):
+    """Opaque pagination cursor for the entry after (score, application_id)"""
+    return base64.urlsafe_b64encode(f"{score:.2f}:{application_id}".encode('utf-8')).decode('ascii')
+
+def decode_rankings_cursor(cursor):
+    """(score, application_id) from a cursor; raises ValueError if malformed"""
+    score, application_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split(':')
+    return float(score), int(application_id)
+
+def get_candidate_data(application_id):
+    """Get complete candidate data for an application"""
+    return candidate_loader.load([application_id])[application_id]
+
+# Seconds from the start of this module's import to each startup milestone
+startup_timings = {'import': time.perf_counter() - startup_started}
+print(f"⚡ AI Service imported in {startup_timings['import']:.2f}s")
+
 if __name__ == '__main__':
+    # Drain the ranking queue alongside the dev server. Workers are started in
+    # the reloader's serving child, whose progress broker they publish to, and
+    # exit with it on reload. Production runs worker.py separately.
+    embedded_workers = int(os.getenv('RANKING_EMBEDDED_WORKERS', '1'))
+    if embedded_workers and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        from worker import progress_queue, start_workers
+        events = progress_queue()
+        progress_broker.listen(events)
+        worker_metrics = progress_queue()
+        metrics_registry.listen(worker_metrics)
+        start_workers(embedded_workers, events, worker_metrics)
+    
     print("🤖 AI Service starting on port 5001")
-    app.run(host='0.0.0.0', port=5001, debug=True)
+    create_app().run(host='0.0.0.0', port=5001, debug=True)
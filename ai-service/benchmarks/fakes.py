@@ -0,0 +1,380 @@
+"""Stand-ins for the service's external dependencies during benchmarks
+
+FakeOpenAI answers embedding and chat requests locally with configurable
+latency and error rates. EmbeddedDatabase runs the service's MySQL queries
+against SQLite through a mysql-connector-shaped connection, so the real
+ConnectionPool, RankingWriter and queries are exercised unchanged while
+every round trip (statements, pings, commits and rollbacks) is counted.
+"""
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+
+class FakeAPIError(Exception):
+    """Error carrying an HTTP status, retried by FeedbackWorkerPool like the real ones"""
+
+    def __init__(self, status_code, message='Simulated API error'):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = None
+
+
+class FakeOpenAI:
+    """Deterministic OpenAI replacement counting requests and tokens.
+
+    Embeddings are unit vectors seeded by the input text. Chat completions
+    return well-formed feedback JSON after `chat_latency` seconds; a
+    `chat_error_rate` fraction of them fail with 429 first. Batched feedback
+    prompts get one entry per "Application <id>:" block, minus a
+    `batch_drop_rate` fraction left out to exercise retries. Exposes both the
+    legacy module-level API (Embedding/ChatCompletion) and the client-style
+    one (embeddings, chat.completions).
+    """
+
+    def __init__(self, embedding_dim=1536, embedding_latency=0.0, chat_latency=0.05,
+                 chat_error_rate=0.0, batch_drop_rate=0.0, seed=0):
+        self.embedding_dim = embedding_dim
+        self.embedding_latency = embedding_latency
+        self.chat_latency = chat_latency
+        self.chat_error_rate = chat_error_rate
+        self.batch_drop_rate = batch_drop_rate
+        self._random = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+        self.reset()
+
+        self.Embedding = SimpleNamespace(create=self.create_embedding)
+        self.ChatCompletion = SimpleNamespace(create=self.create_chat_completion)
+        self.embeddings = SimpleNamespace(create=self.create_embedding)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create_chat_completion))
+
+    def reset(self):
+        with self._lock:
+            self.counters = {
+                'embedding_requests': 0,
+                'embedding_inputs': 0,
+                'chat_requests': 0,
+                'chat_errors': 0,
+                'prompt_tokens': 0,
+                'completion_tokens': 0
+            }
+
+    def _count(self, **amounts):
+        with self._lock:
+            for name, amount in amounts.items():
+                self.counters[name] += amount
+
+    def _vector(self, text):
+        seed = int.from_bytes(hashlib.sha256(text.encode('utf-8')).digest()[:8], 'little')
+        vector = np.random.default_rng(seed).standard_normal(self.embedding_dim)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def create_embedding(self, model=None, input=None, **kwargs):
+        inputs = input if isinstance(input, list) else [input]
+        if self.embedding_latency:
+            time.sleep(self.embedding_latency)
+        self._count(
+            embedding_requests=1,
+            embedding_inputs=len(inputs),
+            prompt_tokens=sum(len(text) // 4 + 1 for text in inputs)
+        )
+        return SimpleNamespace(
+            data=[SimpleNamespace(index=position, embedding=self._vector(text)) for position, text in enumerate(inputs)],
+            usage=SimpleNamespace(prompt_tokens=sum(len(text) // 4 + 1 for text in inputs))
+        )
+
+    def create_chat_completion(self, model=None, messages=None, **kwargs):
+        if self.chat_latency:
+            time.sleep(self.chat_latency)
+        with self._lock:
+            failed = self._random.random() < self.chat_error_rate
+        if failed:
+            self._count(chat_requests=1, chat_errors=1)
+            raise FakeAPIError(429, 'Simulated rate limit')
+
+        prompt_tokens = sum(len(message['content']) // 4 + 1 for message in messages or [])
+        feedback = {
+            'strengths': 'Relevant skills for the role',
+            'missing_skills': 'Some required skills are missing',
+            'suggestions': 'Build experience with the missing skills',
+            'overall_assessment': 'A reasonable fit for this role'
+        }
+        application_ids = re.findall(r'Application (\d+):', (messages or [{}])[-1].get('content', ''))
+        if application_ids:
+            with self._lock:
+                kept = [application_id for application_id in application_ids
+                        if self._random.random() >= self.batch_drop_rate]
+            content = json.dumps({'feedback': [
+                {'application_id': int(application_id), **feedback} for application_id in kept
+            ]})
+        else:
+            content = json.dumps(feedback)
+        completion_tokens = len(content) // 4 + 1
+        self._count(chat_requests=1, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        )
+
+    def install(self, openai_module):
+        """Make openai.OpenAI() clients (and the legacy module-level API) use this fake"""
+        openai_module.OpenAI = lambda **kwargs: self
+        openai_module.Embedding = self.Embedding
+        openai_module.ChatCompletion = self.ChatCompletion
+
+
+SCHEMA = """
+CREATE TABLE users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    email TEXT NOT NULL UNIQUE,
+    password_hash TEXT NOT NULL DEFAULT '',
+    first_name TEXT NOT NULL,
+    last_name TEXT NOT NULL,
+    role TEXT NOT NULL DEFAULT 'candidate'
+);
+CREATE TABLE jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    recruiter_id INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL DEFAULT '',
+    required_skills TEXT NOT NULL,
+    required_education TEXT NOT NULL,
+    required_experience TEXT NOT NULL,
+    status TEXT DEFAULT 'draft',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE applications (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id INTEGER NOT NULL,
+    candidate_id INTEGER NOT NULL,
+    status TEXT DEFAULT 'pending',
+    resume_hash TEXT NOT NULL,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (job_id, candidate_id)
+);
+CREATE INDEX idx_applications_job ON applications (job_id);
+CREATE INDEX idx_applications_candidate ON applications (candidate_id);
+CREATE TABLE skills (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    application_id INTEGER NOT NULL,
+    skill_name TEXT NOT NULL,
+    proficiency_level TEXT DEFAULT 'intermediate',
+    years_of_experience INTEGER NULL
+);
+CREATE INDEX idx_skills_application ON skills (application_id);
+CREATE TABLE education (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    application_id INTEGER NOT NULL,
+    degree TEXT NOT NULL,
+    field_of_study TEXT NOT NULL,
+    institution TEXT NOT NULL,
+    graduation_year INTEGER NULL,
+    gpa REAL NULL
+);
+CREATE INDEX idx_education_application ON education (application_id);
+CREATE TABLE experience (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    application_id INTEGER NOT NULL,
+    job_title TEXT NOT NULL,
+    company TEXT NOT NULL,
+    duration_months INTEGER NOT NULL,
+    start_date DATE NULL,
+    end_date DATE NULL,
+    is_current INTEGER DEFAULT 0,
+    description TEXT NULL
+);
+CREATE INDEX idx_experience_application ON experience (application_id);
+CREATE TABLE rankings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id INTEGER NOT NULL,
+    application_id INTEGER NOT NULL,
+    skill_score REAL NOT NULL DEFAULT 0,
+    education_score REAL NOT NULL DEFAULT 0,
+    experience_score REAL NOT NULL DEFAULT 0,
+    total_score REAL NOT NULL DEFAULT 0,
+    rank_position INTEGER NOT NULL,
+    score_breakdown TEXT NULL,
+    resume_hash TEXT NULL,
+    requirements_hash TEXT NULL,
+    embedding_backend TEXT NULL,
+    ranked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (job_id, application_id)
+);
+CREATE TABLE feedback (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    application_id INTEGER NOT NULL UNIQUE,
+    strengths TEXT NULL,
+    missing_skills TEXT NULL,
+    suggestions TEXT NULL,
+    overall_assessment TEXT NULL,
+    generated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE processing_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id INTEGER NOT NULL,
+    status TEXT DEFAULT 'queued',
+    priority INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker_id TEXT NULL,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    progress INTEGER DEFAULT 0,
+    total_candidates INTEGER DEFAULT 0,
+    processed_candidates INTEGER NOT NULL DEFAULT 0,
+    error_message TEXT NULL,
+    timings TEXT NULL,
+    started_at TIMESTAMP NULL,
+    heartbeat_at TIMESTAMP NULL,
+    checkpoint_at TIMESTAMP NULL,
+    completed_at TIMESTAMP NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX idx_processing_jobs_job ON processing_jobs (job_id);
+"""
+
+# MySQL dialect -> SQLite, applied in order
+TRANSLATIONS = [
+    (re.compile(r'NOW\(\)\s*-\s*INTERVAL\s+%s\s+SECOND', re.I), "datetime('now', '-' || %s || ' seconds')"),
+    (re.compile(r'NOW\(\)', re.I), 'CURRENT_TIMESTAMP'),
+    (re.compile(r'ON DUPLICATE KEY UPDATE', re.I), 'ON CONFLICT DO UPDATE SET'),
+    (re.compile(r'VALUES\((\w+)\)'), r'excluded.\1'),
+    (re.compile(r'FOR UPDATE( SKIP LOCKED)?', re.I), ''),
+    (re.compile(r'<=>'), 'IS'),
+    (re.compile(r'%s'), '?'),
+]
+
+
+def translate(query):
+    for pattern, replacement in TRANSLATIONS:
+        query = pattern.sub(replacement, query)
+    return query
+
+
+class RoundTripCounter:
+    """Thread-safe count of database round trips: statements by leading keyword, plus PING/COMMIT/ROLLBACK"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counts = {}
+
+    def add(self, query, statements=1):
+        keyword = query.lstrip().split(None, 1)[0].upper() if query.strip() else 'OTHER'
+        with self._lock:
+            self.counts[keyword] = self.counts.get(keyword, 0) + statements
+
+    def snapshot(self):
+        with self._lock:
+            counts = dict(self.counts)
+        return {'total': sum(counts.values()), **counts}
+
+
+class EmbeddedCursor:
+    """mysql-connector style cursor over a SQLite cursor"""
+
+    def __init__(self, connection, dictionary=False, buffered=None):
+        self._connection = connection
+        self._cursor = connection.raw.cursor()
+        self._dictionary = dictionary
+        self.lastrowid = None
+        self.rowcount = -1
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return {column[0]: value for column, value in zip(self._cursor.description, row)}
+
+    def execute(self, query, params=None):
+        self._connection.counter.add(query)
+        self._cursor.execute(translate(query), tuple(params or ()))
+        self.rowcount = self._cursor.rowcount
+        self.lastrowid = self._cursor.lastrowid if query.lstrip().upper().startswith('INSERT') else None
+
+    def executemany(self, query, seq_params):
+        # mysql-connector rewrites a batched INSERT into one multi-row statement;
+        # anything else (UPDATE, DELETE) is sent once per parameter set
+        seq_params = [tuple(params) for params in seq_params]
+        batched = query.lstrip().upper().startswith('INSERT')
+        self._connection.counter.add(query, 1 if batched else len(seq_params))
+        self._cursor.executemany(translate(query), seq_params)
+        self.rowcount = self._cursor.rowcount
+        self.lastrowid = None
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchmany(self, size=1):
+        return [self._row(row) for row in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def close(self):
+        self._cursor.close()
+
+
+class EmbeddedConnection:
+    """mysql-connector style connection over one SQLite connection"""
+
+    def __init__(self, path, counter):
+        self.raw = sqlite3.connect(
+            path, timeout=30, check_same_thread=False, detect_types=sqlite3.PARSE_DECLTYPES
+        )
+        self.counter = counter
+
+    @property
+    def in_transaction(self):
+        return self.raw.in_transaction
+
+    def cursor(self, dictionary=False, buffered=None):
+        return EmbeddedCursor(self, dictionary, buffered)
+
+    def ping(self, reconnect=False, attempts=1, delay=0):
+        self.counter.add('PING')
+        return None
+
+    def is_connected(self):
+        return True
+
+    def commit(self):
+        self.counter.add('COMMIT')
+        self.raw.commit()
+
+    def rollback(self):
+        self.counter.add('ROLLBACK')
+        self.raw.rollback()
+
+    def close(self):
+        self.raw.close()
+
+
+class EmbeddedDatabase:
+    """SQLite database file with the service schema, handing out counted connections"""
+
+    def __init__(self, path):
+        self.path = path
+        self.counter = RoundTripCounter()
+        with sqlite3.connect(path) as connection:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.executescript(SCHEMA)
+
+    def connect(self, **connect_args):
+        return EmbeddedConnection(self.path, self.counter)
+
+    def install(self, connector_module):
+        """Make mysql.connector.connect open embedded connections"""
+        connector_module.connect = self.connect
+
+    def raw(self):
+        """Uncounted connection for seeding and inspecting data"""
+        return sqlite3.connect(self.path, timeout=30, detect_types=sqlite3.PARSE_DECLTYPES)
@@ -0,0 +1,304 @@
+"""Ranking benchmarks
+
+Runs the AI service's ranking, feedback and read paths against synthetic
+applicants, with a fake OpenAI client and an embedded SQLite stand-in for
+MySQL, and writes a JSON report (candidates/sec, p50/p99 latencies overall
+and per pipeline stage, database round trips, OpenAI usage and peak memory
+per scenario).
+
+    python benchmarks/run.py --candidates 5000 --output results.json
+
+No MySQL server or OpenAI key is needed. Absolute numbers are not
+comparable to production; compare reports from the same machine.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVICE_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.append(SERVICE_DIR)
+sys.path.append(os.path.join(SERVICE_DIR, 'src'))
+sys.path.append(BENCHMARK_DIR)
+
+from fakes import EmbeddedDatabase, FakeOpenAI  # noqa: E402
+from synthetic import SyntheticData  # noqa: E402
+
+SCENARIOS = ['rank_cold', 'rank_noop', 'rank_incremental', 'feedback', 'score_latency', 'rankings_api', 'batch']
+
+
+def percentiles(samples):
+    if not samples:
+        return {'p50_ms': None, 'p99_ms': None}
+    milliseconds = np.asarray(samples) * 1000
+    return {
+        'p50_ms': round(float(np.percentile(milliseconds, 50)), 3),
+        'p99_ms': round(float(np.percentile(milliseconds, 99)), 3)
+    }
+
+
+class Benchmark:
+    """Shared environment for the scenarios: database, fake OpenAI and the imported app"""
+
+    def __init__(self, args, workdir):
+        self.args = args
+        self.workdir = workdir
+        self.data = SyntheticData(seed=args.seed)
+        self.random = random.Random(args.seed)
+
+        # Fresh caches, an effectively unlimited fake quota and no embedded workers
+        os.environ['EMBEDDING_CACHE_PATH'] = os.path.join(workdir, 'embeddings.sqlite3')
+        os.environ['FEEDBACK_CACHE_PATH'] = os.path.join(workdir, 'feedback.sqlite3')
+        os.environ.setdefault('OPENAI_API_KEY', 'benchmark')
+        os.environ.setdefault('OPENAI_REQUESTS_PER_MINUTE', '1000000')
+        os.environ.setdefault('OPENAI_TOKENS_PER_MINUTE', '1000000000')
+        os.environ['FEEDBACK_WORKERS'] = str(args.feedback_workers)
+        os.environ['EMBEDDING_BACKEND'] = args.embedding_backend
+        os.environ['FEEDBACK_BATCH_SIZE'] = str(args.feedback_batch_size)
+
+        self.database = EmbeddedDatabase(os.path.join(workdir, 'benchmark.sqlite3'))
+        self.openai = FakeOpenAI(
+            embedding_dim=args.embedding_dim,
+            chat_latency=args.chat_latency,
+            chat_error_rate=args.chat_error_rate,
+            batch_drop_rate=args.batch_drop_rate,
+            seed=args.seed
+        )
+
+        import mysql.connector
+        import openai
+        self.database.install(mysql.connector)
+        self.openai.install(openai)
+
+        started = time.perf_counter()
+        import app
+        self.import_seconds = time.perf_counter() - started
+        self.app = app
+        self.client = app.app.test_client()
+        self.record_stages()
+
+        # Feedback runs as its own scenario instead of in a background thread
+        self.feedback_calls = []
+        self.process_feedback = app.process_feedback
+        app.process_feedback = lambda *args: self.feedback_calls.append(args)
+
+        with self.database.raw() as connection:
+            self.single = self.data.populate(connection, jobs=1, candidates=args.candidates, label='single')
+            self.multi = self.data.populate(
+                connection, jobs=args.jobs, candidates=args.candidates,
+                applications_per_candidate=(1, min(3, args.jobs)), label='multi'
+            )
+
+    def record_stages(self):
+        """Keep every stage sample recorded by the app, not just its histogram buckets"""
+        from services import metrics
+        self.stage_samples = {}
+        lock = threading.Lock()
+        observe = metrics.STAGE_SECONDS.observe
+
+        def record(value, **labels):
+            with lock:
+                self.stage_samples.setdefault(labels['stage'], []).append(value)
+            observe(value, **labels)
+
+        metrics.STAGE_SECONDS.observe = record
+
+    def stages(self):
+        return {
+            name: {'count': len(samples), 'seconds': round(sum(samples), 4), **percentiles(samples)}
+            for name, samples in sorted(self.stage_samples.items())
+        }
+
+    def measure(self, scenario):
+        """Run a scenario and add wall time, stage latencies, round trips, OpenAI usage and memory to its result"""
+        self.database.counter.reset()
+        self.openai.reset()
+        self.stage_samples.clear()
+        if self.args.trace_memory:
+            tracemalloc.start()
+
+        started = time.perf_counter()
+        result = scenario()
+        seconds = time.perf_counter() - started
+
+        peak = None
+        if self.args.trace_memory:
+            peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+            tracemalloc.stop()
+
+        result.update({
+            'seconds': round(seconds, 4),
+            'stages': self.stages(),
+            'db_round_trips': self.database.counter.snapshot(),
+            'openai': dict(self.openai.counters),
+            'peak_traced_memory_mb': round(peak, 2) if peak is not None else None,
+            'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2)
+        })
+        if result.get('candidates'):
+            result['candidates_per_second'] = round(result['candidates'] / seconds, 1) if seconds else None
+        return result
+
+    def rank(self, job_id):
+        self.app.process_ranking(job_id)
+        status = self.app.db.execute_query("""
+            SELECT status, total_candidates, error_message FROM processing_jobs
+            WHERE job_id = %s ORDER BY id DESC LIMIT 1
+        """, (job_id,))[0]
+        if status['status'] != 'completed':
+            raise RuntimeError(f"Ranking job {job_id} ended {status['status']}: {status['error_message']}")
+        return status['total_candidates']
+
+    # Scenarios
+
+    def rank_cold(self):
+        """Rank every applicant of one job with cold embedding caches"""
+        return {'candidates': self.rank(self.single['job_ids'][0])}
+
+    def rank_noop(self):
+        """Re-rank with nothing changed"""
+        return {'candidates': self.rank(self.single['job_ids'][0]) or 0}
+
+    def rank_incremental(self):
+        """Re-rank after a fraction of resumes were re-uploaded"""
+        with self.database.raw() as connection:
+            self.data.touch_resumes(connection, self.single['application_ids'], self.args.changed_fraction)
+        return {'candidates': self.rank(self.single['job_ids'][0])}
+
+    def feedback(self):
+        """Generate feedback for the best candidates of the ranked job"""
+        job_id, application_ids, since = next(
+            call for call in self.feedback_calls if call[0] == self.single['job_ids'][0]
+        )
+        application_ids = application_ids[:self.args.feedback_candidates]
+        self.process_feedback(job_id, application_ids, since)
+        return {'candidates': len(application_ids)}
+
+    def score_latency(self):
+        """Synchronous single-application scoring through the HTTP endpoint"""
+        latencies = []
+        for _ in range(self.args.requests):
+            application_id = self.random.choice(self.single['application_ids'])
+            started = time.perf_counter()
+            response = self.client.post('/api/score-application', json={'application_id': application_id})
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise RuntimeError(f"score-application returned {response.status_code}: {response.get_json()}")
+        return {'requests': len(latencies), 'requests_per_second': round(len(latencies) / sum(latencies), 1), **percentiles(latencies)}
+
+    def rankings_api(self):
+        """Leaderboard pages, then the same pages revalidated with If-None-Match"""
+        job_id = self.single['job_ids'][0]
+        latencies, revalidations, not_modified = [], [], 0
+        cursor = None
+        pages = []
+        for _ in range(self.args.requests):
+            query = f'/api/rankings/{job_id}?top=50' + (f'&cursor={cursor}' if cursor else '')
+            started = time.perf_counter()
+            response = self.client.get(query)
+            latencies.append(time.perf_counter() - started)
+            pages.append((query, response.headers.get('ETag')))
+            cursor = response.get_json()['data']['next_cursor']
+
+        for query, etag in pages:
+            started = time.perf_counter()
+            response = self.client.get(query, headers={'If-None-Match': etag})
+            revalidations.append(time.perf_counter() - started)
+            not_modified += response.status_code == 304
+
+        return {
+            'requests': len(latencies) + len(revalidations),
+            **percentiles(latencies),
+            'revalidate': {**percentiles(revalidations), 'not_modified': not_modified}
+        }
+
+    def batch(self):
+        """Rank several jobs sharing applicants in one batch"""
+        runs = []
+        for job_id in self.multi['job_ids']:
+            processing_id = self.app.db.execute_query("""
+                INSERT INTO processing_jobs (job_id, status, started_at)
+                VALUES (%s, 'processing', %s)
+            """, (job_id, datetime.now()))
+            runs.append((job_id, processing_id))
+        self.app.process_ranking_batch(runs)
+        return {'candidates': len(self.multi['application_ids']), 'jobs': len(runs)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the ranking pipeline on synthetic data')
+    parser.add_argument('--candidates', type=int, default=2000, help='applicants per dataset')
+    parser.add_argument('--jobs', type=int, default=5, help='jobs in the multi-job batch dataset')
+    parser.add_argument('--requests', type=int, default=200, help='requests per latency scenario')
+    parser.add_argument('--feedback-candidates', type=int, default=200, help='applications in the feedback scenario')
+    parser.add_argument('--feedback-workers', type=int, default=8)
+    parser.add_argument('--changed-fraction', type=float, default=0.05, help='resumes changed before incremental re-rank')
+    parser.add_argument('--chat-latency', type=float, default=0.05, help='simulated seconds per chat completion')
+    parser.add_argument('--chat-error-rate', type=float, default=0.0, help='fraction of chat requests failing with 429')
+    parser.add_argument('--feedback-batch-size', type=int, default=5, help='candidates per feedback request')
+    parser.add_argument('--batch-drop-rate', type=float, default=0.0,
+                        help='fraction of batched feedback entries the fake model leaves out')
+    parser.add_argument('--embedding-dim', type=int, default=1536)
+    parser.add_argument('--embedding-backend', choices=['openai', 'local'], default='openai',
+                        help="'local' ranks with offline hashed n-gram embeddings")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--trace-memory', action='store_true', help='record peak Python allocations (slower)')
+    parser.add_argument('--output', help='report path (default: benchmarks/results/benchmark-<timestamp>.json)')
+    args = parser.parse_args()
+
+    output = args.output or os.path.join(
+        BENCHMARK_DIR, 'results', f"benchmark-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+
+    with tempfile.TemporaryDirectory(prefix='ai-service-benchmark-') as workdir:
+        print(f"🧪 Preparing {args.candidates} synthetic candidates")
+        benchmark = Benchmark(args, workdir)
+
+        report = {
+            'generated_at': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'config': vars(args),
+            'import_seconds': round(benchmark.import_seconds, 4),
+            'scenarios': {}
+        }
+
+        # 'feedback' replays the feedback stage queued by 'rank_cold'
+        scenarios = list(args.scenarios)
+        if 'feedback' in scenarios and 'rank_cold' not in scenarios:
+            scenarios.insert(0, 'rank_cold')
+
+        for name in SCENARIOS:
+            if name not in scenarios:
+                continue
+            print(f"⏱️  {name}")
+            result = benchmark.measure(getattr(benchmark, name))
+            report['scenarios'][name] = result
+            summary = ', '.join(
+                f"{key}={result[key]}" for key in ('candidates_per_second', 'p50_ms', 'p99_ms', 'seconds')
+                if result.get(key) is not None
+            )
+            print(f"   {summary}, db_round_trips={result['db_round_trips']['total']}")
+
+        # Seconds from the app's import to its first served request, as the app measured them
+        report['startup'] = {phase: round(seconds, 4) for phase, seconds in benchmark.app.startup_timings.items()}
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as report_file:
+        json.dump(report, report_file, indent=2, default=str)
+    print(f"✅ Benchmark report written to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""Synthetic jobs and applicants for benchmarks
+
+Generates reproducible (seeded) jobs and candidate applications shaped like
+the data the resume parser stores, and loads them into a database through
+plain executemany inserts.
+"""
+import hashlib
+import json
+import random
+
+SKILL_POOL = [
+    'python', 'java', 'javascript', 'typescript', 'go', 'rust', 'c++', 'c#', 'ruby', 'php',
+    'kotlin', 'swift', 'scala', 'sql', 'mysql', 'postgresql', 'mongodb', 'redis', 'elasticsearch',
+    'react', 'angular', 'vue', 'node.js', 'express', 'django', 'flask', 'fastapi', 'spring',
+    'rails', 'laravel', 'docker', 'kubernetes', 'terraform', 'ansible', 'aws', 'azure', 'gcp',
+    'linux', 'git', 'ci/cd', 'jenkins', 'graphql', 'rest', 'grpc', 'kafka', 'rabbitmq', 'spark',
+    'hadoop', 'airflow', 'pandas', 'numpy', 'scikit-learn', 'tensorflow', 'pytorch',
+    'machine learning', 'deep learning', 'nlp', 'computer vision', 'data analysis', 'statistics',
+    'tableau', 'power bi', 'excel', 'html', 'css', 'sass', 'webpack', 'testing', 'selenium',
+    'agile', 'scrum', 'communication', 'leadership', 'teamwork', 'problem solving',
+    'project management', 'system design', 'microservices', 'security', 'networking',
+]
+
+DEGREES = ['bachelor', 'master', 'phd', 'associate', 'diploma']
+FIELDS = [
+    'computer science', 'software engineering', 'information technology', 'electrical engineering',
+    'mechanical engineering', 'data science', 'mathematics', 'physics', 'business', 'economics',
+]
+TITLES = [
+    'software engineer', 'backend developer', 'frontend developer', 'full stack developer',
+    'data scientist', 'data engineer', 'devops engineer', 'qa engineer', 'product manager',
+    'machine learning engineer', 'mobile developer', 'support engineer', 'analyst',
+]
+
+
+class SyntheticData:
+    """Seeded generator of jobs and applicants.
+
+    Skills are drawn with a skewed distribution so popular skills dominate,
+    like real resumes. Each candidate has one resume (and resume_hash) reused
+    for every job they apply to.
+    """
+
+    def __init__(self, seed=42):
+        self.random = random.Random(seed)
+        self._weights = [1.0 / (rank + 1) ** 0.8 for rank in range(len(SKILL_POOL))]
+
+    def skills(self, count):
+        chosen = set()
+        while len(chosen) < count:
+            chosen.add(self.random.choices(SKILL_POOL, weights=self._weights)[0])
+        return sorted(chosen)
+
+    def job(self):
+        title = self.random.choice(TITLES)
+        return {
+            'title': title.title(),
+            'required_skills': self.skills(self.random.randint(4, 10)),
+            'required_education': self.random.sample(DEGREES[:3], self.random.randint(1, 2)),
+            'required_experience': {
+                'min_years': self.random.randint(0, 6),
+                'preferred_roles': [title] + self.random.sample(TITLES, 1)
+            }
+        }
+
+    def candidate(self, candidate_id):
+        resume = {
+            'skills': self.skills(self.random.randint(3, 20)),
+            'education': [
+                {
+                    'degree': self.random.choice(DEGREES).title(),
+                    'field_of_study': self.random.choice(FIELDS).title(),
+                    'institution': f'University {self.random.randint(1, 300)}',
+                    'graduation_year': self.random.randint(1995, 2025)
+                }
+                for _ in range(self.random.randint(0, 2))
+            ],
+            'experience': [
+                {
+                    'job_title': self.random.choice(TITLES).title(),
+                    'company': f'Company {self.random.randint(1, 2000)}',
+                    'duration_months': self.random.randint(3, 72)
+                }
+                for _ in range(self.random.randint(0, 4))
+            ]
+        }
+        resume['resume_hash'] = hashlib.sha256(
+            json.dumps([candidate_id, resume], sort_keys=True).encode('utf-8')
+        ).hexdigest()
+        return resume
+
+    def populate(self, connection, jobs=1, candidates=1000, applications_per_candidate=(1, 1), label='bench'):
+        """Insert jobs, candidates and applications; returns {'job_ids', 'application_ids'}"""
+        cursor = connection.cursor()
+        cursor.execute(
+            "INSERT INTO users (email, first_name, last_name, role) VALUES (?, 'Rita', 'Recruiter', 'recruiter')",
+            (f'{label}-recruiter@example.com',)
+        )
+        recruiter_id = cursor.lastrowid
+
+        job_ids = []
+        for _ in range(jobs):
+            job = self.job()
+            cursor.execute(
+                """INSERT INTO jobs (recruiter_id, title, required_skills, required_education, required_experience, status)
+                   VALUES (?, ?, ?, ?, ?, 'published')""",
+                (recruiter_id, job['title'], json.dumps(job['required_skills']),
+                 json.dumps(job['required_education']), json.dumps(job['required_experience']))
+            )
+            job_ids.append(cursor.lastrowid)
+
+        application_ids = []
+        skills, education, experience = [], [], []
+        for number in range(candidates):
+            cursor.execute(
+                "INSERT INTO users (email, first_name, last_name) VALUES (?, ?, ?)",
+                (f'{label}-candidate{number}@example.com', f'Candidate{number}', 'Synthetic')
+            )
+            candidate_id = cursor.lastrowid
+            resume = self.candidate(candidate_id)
+
+            low, high = applications_per_candidate
+            applied_jobs = self.random.sample(job_ids, min(len(job_ids), self.random.randint(low, high)))
+            for job_id in applied_jobs:
+                cursor.execute(
+                    "INSERT INTO applications (job_id, candidate_id, resume_hash) VALUES (?, ?, ?)",
+                    (job_id, candidate_id, resume['resume_hash'])
+                )
+                application_id = cursor.lastrowid
+                application_ids.append(application_id)
+                skills.extend((application_id, name) for name in resume['skills'])
+                education.extend(
+                    (application_id, entry['degree'], entry['field_of_study'], entry['institution'], entry['graduation_year'])
+                    for entry in resume['education']
+                )
+                experience.extend(
+                    (application_id, entry['job_title'], entry['company'], entry['duration_months'])
+                    for entry in resume['experience']
+                )
+
+        cursor.executemany("INSERT INTO skills (application_id, skill_name) VALUES (?, ?)", skills)
+        cursor.executemany(
+            "INSERT INTO education (application_id, degree, field_of_study, institution, graduation_year) VALUES (?, ?, ?, ?, ?)",
+            education
+        )
+        cursor.executemany(
+            "INSERT INTO experience (application_id, job_title, company, duration_months) VALUES (?, ?, ?, ?)",
+            experience
+        )
+        connection.commit()
+        return {'job_ids': job_ids, 'application_ids': application_ids}
+
+    def touch_resumes(self, connection, application_ids, fraction):
+        """Change the resume hash of a fraction of applications, as if resumes were re-uploaded"""
+        chosen = self.random.sample(application_ids, int(len(application_ids) * fraction))
+        connection.executemany(
+            "UPDATE applications SET resume_hash = ? WHERE id = ?",
+            [(hashlib.sha256(f'updated-{application_id}'.encode('utf-8')).hexdigest(), application_id)
+             for application_id in chosen]
+        )
+        connection.commit()
+        return chosen
@@ -1,70 +1,308 @@
 import mysql.connector
 from mysql.connector import Error
 import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
 from dotenv import load_dotenv
 
+from services.metrics import DB_ERRORS, DB_QUERIES, DB_QUERY_SECONDS, record_stage
+
 load_dotenv()
 
+class PoolTimeoutError(Error):
+    """Raised when no connection becomes available within the pool timeout"""
+
+class ConnectionPool:
+    """Fixed-size pool of MySQL connections shared by request and worker threads.
+
+    Connections are created lazily up to `size`, health-checked when checked
+    out and handed to one thread at a time. Callers wait up to `timeout`
+    seconds for a free connection.
+    """
+
+    def __init__(self, size=10, timeout=10.0, **connect_args):
+        self.size = size
+        self.timeout = timeout
+        self.connect_args = connect_args
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.reconnects = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _create(self):
+        return mysql.connector.connect(**self.connect_args)
+
+    def _healthy(self, connection):
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except Error:
+            return False
+
+    def acquire(self):
+        """Check a healthy connection out of the pool"""
+        started = time.monotonic()
+        connection = None
+
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created < self.size
+                if can_create:
+                    self._created += 1
+            if can_create:
+                try:
+                    connection = self._create()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                with self._lock:
+                    self.waits += 1
+                try:
+                    connection = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self.timeouts += 1
+                    raise PoolTimeoutError(f"No database connection available within {self.timeout}s")
+
+        if not self._healthy(connection):
+            try:
+                connection.close()
+            except Error:
+                pass
+            try:
+                connection = self._create()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+            with self._lock:
+                self.reconnects += 1
+
+        waited = time.monotonic() - started
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        return connection
+
+    def open_dedicated(self):
+        """A new connection outside the pool's slots, for long-held work; the caller closes it"""
+        return self._create()
+
+    def release(self, connection):
+        """Return a connection to the pool, discarding any open transaction"""
+        try:
+            if connection.in_transaction:
+                connection.rollback()
+            self._idle.put(connection)
+        except Error:
+            with self._lock:
+                self._created -= 1
+
+    def discard(self, connection):
+        """Close a connection that must not be reused (e.g. with unread results) and free its slot"""
+        try:
+            connection.close()
+        except Error:
+            pass
+        with self._lock:
+            self._created -= 1
+
+    def close_all(self):
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                connection.close()
+            except Error:
+                pass
+            with self._lock:
+                self._created -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': self.size,
+                'open': self._created,
+                'idle': self._idle.qsize(),
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'timeouts': self.timeouts,
+                'reconnects': self.reconnects,
+                'total_wait_seconds': self.total_wait_seconds,
+                'max_wait_seconds': self.max_wait_seconds
+            }
+
+def statement_kind(query):
+    """Metric label for a query: its leading keyword (select, insert, update, ...)"""
+    words = query.split(None, 1)
+    return words[0].lower() if words else 'unknown'
+
 class Database:
+    """Pooled MySQL access, connected on first use.
+
+    Nothing is opened at import, so the app (and each worker process) starts
+    without waiting on MySQL; connect() opens the pool eagerly when a caller
+    wants misconfiguration to fail fast. A pool inherited across fork() is
+    replaced rather than shared with the parent.
+    """
+
     def __init__(self):
-        self.connection = None
-        self.connect()
-    
+        self.pool = None
+        self._pool_pid = None
+        self._lock = threading.Lock()
+
+    def create_pool(self):
+        return ConnectionPool(
+            size=int(os.getenv('DATABASE_POOL_SIZE', '10')),
+            timeout=float(os.getenv('DATABASE_POOL_TIMEOUT', '10')),
+            host=os.getenv('DATABASE_HOST', 'localhost'),
+            user=os.getenv('DATABASE_USER', 'root'),
+            password=os.getenv('DATABASE_PASSWORD', ''),
+            database=os.getenv('DATABASE_NAME', 'resume_screening')
+        )
+
+    def get_pool(self):
+        """The connection pool, created on first use in this process"""
+        if self.pool is None or self._pool_pid != os.getpid():
+            with self._lock:
+                if self.pool is None or self._pool_pid != os.getpid():
+                    self.pool = self.create_pool()
+                    self._pool_pid = os.getpid()
+        return self.pool
+
     def connect(self):
+        """Open the first connection now so misconfiguration fails fast"""
         try:
-            self.connection = mysql.connector.connect(
-                host=os.getenv('DATABASE_HOST', 'localhost'),
-                user=os.getenv('DATABASE_USER', 'root'),
-                password=os.getenv('DATABASE_PASSWORD', ''),
-                database=os.getenv('DATABASE_NAME', 'resume_screening'),
-                pool_name='ai_service_pool',
-                pool_size=5
-            )
-            if self.connection.is_connected():
-                print("✅ Database connected successfully")
+            pool = self.get_pool()
+            pool.release(pool.acquire())
+            print("✅ Database connected successfully")
         except Error as e:
             print(f"❌ Database connection failed: {e}")
             raise e
-    
+
+    def stats(self):
+        """Pool stats, or None before the first connection"""
+        return self.pool.stats() if self.pool is not None and self._pool_pid == os.getpid() else None
+
     def disconnect(self):
-        if self.connection and self.connection.is_connected():
-            self.connection.close()
+        if self.pool and self._pool_pid == os.getpid():
+            self.pool.close_all()
             print("Database connection closed")
-    
-    def get_connection(self):
-        if not self.connection or not self.connection.is_connected():
-            self.connect()
-        return self.connection
-    
-    def execute_query(self, query, params=None):
-        connection = self.get_connection()
-        cursor = connection.cursor(dictionary=True)
+
+    @contextmanager
+    def connection(self):
+        """Check a connection out of the pool for one unit of work"""
+        pool = self.get_pool()
+        connection = pool.acquire()
         try:
-            cursor.execute(query, params)
-            if query.strip().upper().startswith('SELECT'):
-                result = cursor.fetchall()
-            else:
-                connection.commit()
-                result = cursor.lastrowid if cursor.lastrowid else cursor.rowcount
-            return result
-        except Error as e:
-            connection.rollback()
-            raise e
+            yield connection
         finally:
-            cursor.close()
-    
-    def execute_many(self, query, params_list):
-        connection = self.get_connection()
-        cursor = connection.cursor()
+            pool.release(connection)
+
+    @contextmanager
+    def measure(self, statement):
+        """Count and time one statement or transaction (also as the 'db' stage of a ranking run)"""
+        started = time.perf_counter()
         try:
-            cursor.executemany(query, params_list)
-            connection.commit()
-            return cursor.rowcount
-        except Error as e:
-            connection.rollback()
-            raise e
+            yield
+        except Exception:
+            DB_ERRORS.inc(statement=statement)
+            raise
         finally:
+            seconds = time.perf_counter() - started
+            DB_QUERIES.inc(statement=statement)
+            DB_QUERY_SECONDS.observe(seconds, statement=statement)
+            record_stage('db', seconds)
+
+    @contextmanager
+    def transaction(self):
+        """Run several statements on one connection and commit them together"""
+        with self.measure('transaction'), self.connection() as connection:
+            cursor = connection.cursor(dictionary=True)
+            try:
+                yield cursor
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def execute_query(self, query, params=None):
+        with self.measure(statement_kind(query)), self.connection() as connection:
+            cursor = connection.cursor(dictionary=True)
+            try:
+                cursor.execute(query, params)
+                if query.strip().upper().startswith('SELECT'):
+                    result = cursor.fetchall()
+                else:
+                    connection.commit()
+                    result = cursor.lastrowid if cursor.lastrowid else cursor.rowcount
+                return result
+            except Error as e:
+                connection.rollback()
+                raise e
+            finally:
+                cursor.close()
+
+    def stream(self, query, params=None, batch_size=1000):
+        """Yield the rows of a SELECT through an unbuffered (server-side) cursor.
+
+        Rows are fetched `batch_size` at a time, so memory stays flat however
+        large the result. The stream holds its own connection, opened outside
+        the pool, until the generator is exhausted or closed: a slow client
+        downloading an export must not take a slot from ranking workers and
+        API requests.
+        """
+        connection = self.get_pool().open_dedicated()
+        started = time.perf_counter()
+        try:
+            cursor = connection.cursor(dictionary=True, buffered=False)
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
             cursor.close()
+        except Exception:
+            DB_ERRORS.inc(statement='stream')
+            raise
+        finally:
+            DB_QUERIES.inc(statement='stream')
+            DB_QUERY_SECONDS.observe(time.perf_counter() - started, statement='stream')
+            try:
+                connection.close()
+            except Error:
+                pass
+
+    def execute_many(self, query, params_list):
+        with self.measure(statement_kind(query)), self.connection() as connection:
+            cursor = connection.cursor()
+            try:
+                cursor.executemany(query, params_list)
+                connection.commit()
+                return cursor.rowcount
+            except Error as e:
+                connection.rollback()
+                raise e
+            finally:
+                cursor.close()
 
-# Create database instance
+# Create database instance (connects on first use)
 db = Database()
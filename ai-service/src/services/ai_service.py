@@ -1,33 +1,244 @@
-import openai
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 import json
 import os
+import threading
+import time
+from functools import partial
 from dotenv import load_dotenv
 
+from services.embedding_backends import create_embedding_backend
+from services.embedding_cache import EmbeddingCache
+from services.metrics import (
+    EMBEDDING_FALLBACKS, FEEDBACK_FALLBACKS, OPENAI_REQUEST_SECONDS, OPENAI_REQUESTS, record_stage, record_usage
+)
+from services.skill_vectors import EmbeddingUnavailable, SkillVectorVocabulary
+
 load_dotenv()
 
-# Initialize OpenAI client (using v1.3.7 API)
-openai.api_key = os.getenv('OPENAI_API_KEY')
+_openai = None
+
+def get_openai():
+    """The openai package, imported on first use.
+
+    Importing it takes a few hundred milliseconds, which would otherwise be
+    paid by every process start whether or not it calls the API.
+    """
+    global _openai
+    if _openai is None:
+        import openai
+        _openai = openai
+    return _openai
+
+# Bump when the feedback prompt changes so cached feedback is not reused
+FEEDBACK_PROMPT_VERSION = 2
+
+def feedback_prompt_variant(batched=False):
+    """Prompt version plus variant ('single' or 'batch') for feedback cache keys.
+
+    Batched requests use a different prompt than single ones, so their
+    feedback is cached separately.
+    """
+    return f"{FEEDBACK_PROMPT_VERSION}-{'batch' if batched else 'single'}"
+
+# Fields every feedback entry must have, as non-empty strings
+FEEDBACK_FIELDS = ('strengths', 'missing_skills', 'suggestions', 'overall_assessment')
+
+FEEDBACK_SYSTEM_PROMPT = "You are an expert career counselor providing constructive feedback."
+
+# Returned when the chat model's answer is not valid JSON
+PARSE_FALLBACK_FEEDBACK = {
+    "strengths": "Your experience shows relevant background",
+    "missing_skills": "Consider developing additional technical skills",
+    "suggestions": "Focus on gaining more hands-on experience",
+    "overall_assessment": "Continue developing your skills for better alignment"
+}
+
+# Returned when the chat model cannot be reached
+DEFAULT_FEEDBACK = {
+    "strengths": "Your application has been reviewed",
+    "missing_skills": "Review the job requirements for skill gaps",
+    "suggestions": "Continue learning and gaining experience",
+    "overall_assessment": "Thank you for your interest in this position"
+}
+
+DEFAULT_EMBEDDING_CACHE_PATH = os.path.join(
+    os.path.dirname(__file__), '..', '..', 'cache', 'embeddings.sqlite3'
+)
 
 class AIService:
     def __init__(self):
         self.model = "gpt-4o-mini"
+        self.embedding_model = "text-embedding-ada-002"
+        self.embedding_cache = EmbeddingCache(
+            path=os.getenv('EMBEDDING_CACHE_PATH', DEFAULT_EMBEDDING_CACHE_PATH),
+            max_entries=int(os.getenv('EMBEDDING_CACHE_SIZE', '10000'))
+        )
+        self._client = None
+        self._client_lock = threading.Lock()
+        
+        # Embeddings come from EMBEDDING_BACKEND ('openai' or the offline
+        # 'local'); while it fails or times out, semantic scoring switches
+        # to EMBEDDING_FALLBACK for a cooldown period
+        backend_options = dict(
+            ai_service=self,
+            embedding_model=self.embedding_model,
+            timeout=float(os.getenv('EMBEDDING_TIMEOUT_SECONDS', '10')),
+            local_dim=int(os.getenv('LOCAL_EMBEDDING_DIM', '512')),
+            max_batch_size=int(os.getenv('EMBEDDING_BATCH_SIZE', '256')),
+            max_wait=float(os.getenv('EMBEDDING_BATCH_WAIT_MS', '10')) / 1000
+        )
+        self.embedding_backend = create_embedding_backend(os.getenv('EMBEDDING_BACKEND', 'openai'), **backend_options)
+        fallback = os.getenv('EMBEDDING_FALLBACK', 'local')
+        self.fallback_backend = (
+            create_embedding_backend(fallback, **backend_options)
+            if fallback and fallback != os.getenv('EMBEDDING_BACKEND', 'openai') else None
+        )
+        self.fallback_cooldown = float(os.getenv('EMBEDDING_FALLBACK_COOLDOWN_SECONDS', '60'))
+        self.fallback_until = 0.0
+        
+        # Skills kept per vector vocabulary (one row of the embedding dimension each)
+        vocabulary_size = int(os.getenv('SKILL_VECTOR_VOCABULARY_SIZE', '20000'))
+        self.skill_vectors = SkillVectorVocabulary(
+            partial(self.embed_texts, self.embedding_backend),
+            name=self.embedding_backend.name,
+            max_entries=vocabulary_size
+        )
+        self.fallback_skill_vectors = (
+            SkillVectorVocabulary(
+                partial(self.embed_texts, self.fallback_backend),
+                name=self.fallback_backend.name,
+                max_entries=vocabulary_size
+            )
+            if self.fallback_backend else None
+        )
+    
+    @property
+    def client(self):
+        """OpenAI API client, created on first use"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = get_openai().OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        return self._client
+    
+    def call_openai(self, operation, create, **params):
+        """Call an OpenAI endpoint, recording request counts, latency and token usage"""
+        started = time.perf_counter()
+        try:
+            response = create(**params)
+        except Exception:
+            OPENAI_REQUESTS.inc(operation=operation, outcome='error')
+            raise
+        finally:
+            seconds = time.perf_counter() - started
+            OPENAI_REQUEST_SECONDS.observe(seconds, operation=operation)
+            record_stage(f'openai_{operation}', seconds)
+        OPENAI_REQUESTS.inc(operation=operation, outcome='success')
+        record_usage(operation, response)
+        return response
+    
+    def embed_texts(self, backend, texts):
+        """Embed many texts with one backend call for the cache misses.
+        
+        Remote embeddings are cached by backend name and text; local ones
+        are cheaper to recompute. Returns one vector per text, or None
+        entries if the backend failed, in which case semantic scoring
+        switches to the fallback backend for a while.
+        """
+        texts = list(texts)
+        vectors = [None] * len(texts)
+        missing = {}
+        for position, text in enumerate(texts):
+            cached = self.embedding_cache.get(backend.name, text) if backend.remote else None
+            if cached is None:
+                missing.setdefault(text, []).append(position)
+            else:
+                vectors[position] = cached
+        if not missing:
+            return vectors
+        
+        try:
+            embedded = backend.embed(list(missing))
+        except Exception as e:
+            print(f"Error generating embeddings: {e}")
+            if backend is self.embedding_backend and self.fallback_backend is not None:
+                if time.monotonic() >= self.fallback_until:
+                    print(f"⚠️ Using {self.fallback_backend.name} embeddings for {self.fallback_cooldown:.0f}s")
+                    EMBEDDING_FALLBACKS.inc()
+                self.fallback_until = time.monotonic() + self.fallback_cooldown
+            return vectors
+        
+        for (text, positions), vector in zip(missing.items(), embedded):
+            if backend.remote:
+                vector = self.embedding_cache.put(backend.name, text, vector)
+            for position in positions:
+                vectors[position] = vector
+        return vectors
     
     def generate_embedding(self, text):
-        """Generate embedding for given text using OpenAI"""
+        """Generate embedding for given text, served from cache when possible"""
+        return self.embed_texts(self.embedding_backend, [text])[0]
+    
+    def semantic_skill_vectors(self):
+        """Skill vectors to score with: the fallback backend's while the primary is failing
+        
+        Ranking runs pick these once and score every candidate with them (see
+        calculate_semantic_skill_scores), so a job is never ranked in two
+        vector spaces.
+        """
+        if self.fallback_skill_vectors is not None and time.monotonic() < self.fallback_until:
+            return self.fallback_skill_vectors
+        return self.skill_vectors
+    
+    def interactive_skill_vectors(self, names):
+        """Skill vectors for latency-sensitive scoring of `names`, without remote embedding calls
+        
+        The healthy backend's vectors when they already hold every name (or
+        need no network); otherwise the local fallback's, when configured.
+        """
+        vocabulary = self.semantic_skill_vectors()
+        if vocabulary is not self.skill_vectors or not self.embedding_backend.remote or vocabulary.contains(names):
+            return vocabulary
+        if self.fallback_backend is not None and not self.fallback_backend.remote:
+            return self.fallback_skill_vectors
+        return vocabulary
+    
+    def calculate_semantic_skill_scores(self, candidates_skills, required_skills, vocabulary=None):
+        """Semantic skill scores (0-100) for a batch of candidates against one job
+        
+        With `vocabulary` (a run's pinned skill vectors) only that backend is
+        used: if it is the primary and fails while a fallback is configured,
+        EmbeddingUnavailable is raised instead of scoring the batch in another
+        vector space or without the skills that failed.
+        """
         try:
-            response = openai.Embedding.create(
-                model="text-embedding-ada-002",
-                input=text
-            )
-            return np.array(response.data[0].embedding)
+            candidates_skill_names = [
+                [skill.get('skill_name', '') for skill in skills or []]
+                for skills in candidates_skills
+            ]
+            if vocabulary is not None:
+                strict = vocabulary is self.skill_vectors and self.fallback_skill_vectors is not None
+                return vocabulary.match_scores(candidates_skill_names, required_skills or [], strict=strict)
+            
+            vocabulary = self.semantic_skill_vectors()
+            scores = vocabulary.match_scores(candidates_skill_names, required_skills or [])
+            if self.semantic_skill_vectors() is not vocabulary:
+                # The primary backend failed mid-batch: rescore the whole batch in one vector space
+                scores = self.semantic_skill_vectors().match_scores(candidates_skill_names, required_skills or [])
+            return scores
+        except EmbeddingUnavailable:
+            raise
         except Exception as e:
-            print(f"Error generating embedding: {e}")
-            return None
+            print(f"Error calculating semantic skill scores: {e}")
+            return np.zeros(len(candidates_skills))
     
-    def calculate_skill_match(self, candidate_skills, required_skills):
-        """Calculate skill matching score using keyword and semantic similarity"""
+    def calculate_skill_match(self, candidate_skills, required_skills, semantic_score=None):
+        """Calculate skill matching score using keyword and semantic similarity
+        
+        semantic_score can be precomputed for a whole job with
+        calculate_semantic_skill_scores; otherwise it is computed for this
+        candidate alone.
+        """
         if not candidate_skills or not required_skills:
             return 0.0
         
@@ -39,30 +250,15 @@ class AIService:
         keyword_matches = len(set(candidate_skill_names) & set(required_skill_names))
         keyword_score = (keyword_matches / len(required_skill_names)) * 100
         
-        # Semantic matching using embeddings
+        # Semantic matching using per-skill embeddings
         if keyword_matches < len(required_skill_names):
-            try:
-                candidate_text = ' '.join(candidate_skill_names)
-                required_text = ' '.join(required_skill_names)
-                
-                candidate_embedding = self.generate_embedding(candidate_text)
-                required_embedding = self.generate_embedding(required_text)
-                
-                if candidate_embedding is not None and required_embedding is not None:
-                    semantic_similarity = cosine_similarity(
-                        candidate_embedding.reshape(1, -1),
-                        required_embedding.reshape(1, -1)
-                    )[0][0]
-                    semantic_score = semantic_similarity * 100
-                else:
-                    semantic_score = 0
-            except:
-                semantic_score = 0
+            if semantic_score is None:
+                semantic_score = self.calculate_semantic_skill_scores([candidate_skills], required_skills)[0]
         else:
             semantic_score = 100
         
         # Combine scores (70% keyword, 30% semantic)
-        final_score = (keyword_score * 0.7) + (semantic_score * 0.3)
+        final_score = (keyword_score * 0.7) + (float(semantic_score) * 0.3)
         return min(final_score, 100.0)
     
     def calculate_education_match(self, candidate_education, required_education):
@@ -122,72 +318,177 @@ class AIService:
         
         return (years_score * 0.6) + (role_score * 0.4)
     
+    def build_feedback_prompt(self, candidate_data, job_data, scores):
+        """Build the feedback prompt for one candidate"""
+        # Extract relevant information
+        skills = [skill.get('skill_name', '') for skill in candidate_data.get('skills', [])]
+        education = [f"{edu.get('degree', '')} in {edu.get('field_of_study', '')}" 
+                     for edu in candidate_data.get('education', [])]
+        experience = [f"{exp.get('job_title', '')} at {exp.get('company', '')}" 
+                     for exp in candidate_data.get('experience', [])]
+        
+        required_skills = job_data.get('required_skills', [])
+        
+        return f"""
+        As an expert career counselor, provide constructive feedback for a job applicant.
+        
+        Candidate Profile:
+        - Skills: {', '.join(skills)}
+        - Education: {', '.join(education)}
+        - Experience: {', '.join(experience)}
+        
+        Job Requirements:
+        - Required Skills: {', '.join(required_skills)}
+        
+        Scores:
+        - Skill Match: {scores.get('skill_score', 0):.1f}%
+        - Education Match: {scores.get('education_score', 0):.1f}%
+        - Experience Match: {scores.get('experience_score', 0):.1f}%
+        - Total Score: {scores.get('total_score', 0):.1f}%
+        
+        Provide feedback in the following JSON format:
+        {{
+            "strengths": "List the candidate's key strengths for this role",
+            "missing_skills": "Identify important skills that are missing or need improvement",
+            "suggestions": "Provide actionable suggestions for improvement",
+            "overall_assessment": "Give an overall assessment of fit for this role"
+        }}
+        
+        Be encouraging but realistic. Focus on specific, actionable advice.
+        """
+    
+    def build_batch_feedback_prompt(self, candidates, job_data):
+        """Build one feedback prompt for several (application_id, candidate_data, scores) of the same job"""
+        profiles = []
+        for application_id, candidate_data, scores in candidates:
+            skills = [skill.get('skill_name', '') for skill in candidate_data.get('skills', [])]
+            education = [f"{edu.get('degree', '')} in {edu.get('field_of_study', '')}"
+                         for edu in candidate_data.get('education', [])]
+            experience = [f"{exp.get('job_title', '')} at {exp.get('company', '')}"
+                          for exp in candidate_data.get('experience', [])]
+            profiles.append(f"""
+        Application {application_id}:
+        - Skills: {', '.join(skills)}
+        - Education: {', '.join(education)}
+        - Experience: {', '.join(experience)}
+        - Scores: skill {scores.get('skill_score', 0):.1f}%, education {scores.get('education_score', 0):.1f}%, experience {scores.get('experience_score', 0):.1f}%, total {scores.get('total_score', 0):.1f}%""")
+        
+        required_skills = job_data.get('required_skills', [])
+        
+        return f"""
+        As an expert career counselor, provide constructive feedback for each of these applicants to the same job.
+        
+        Job Requirements:
+        - Required Skills: {', '.join(required_skills)}
+        
+        Candidate Profiles:{''.join(profiles)}
+        
+        Respond with a JSON object whose "feedback" array has exactly one entry per application, in this format:
+        {{
+            "feedback": [
+                {{
+                    "application_id": <the application's number>,
+                    "strengths": "List the candidate's key strengths for this role",
+                    "missing_skills": "Identify important skills that are missing or need improvement",
+                    "suggestions": "Provide actionable suggestions for improvement",
+                    "overall_assessment": "Give an overall assessment of fit for this role"
+                }}
+            ]
+        }}
+        
+        Be encouraging but realistic. Focus on specific, actionable advice for each candidate.
+        """
+    
+    def validate_feedback(self, entry):
+        """The four feedback fields as stripped strings, or None if any is missing or empty"""
+        if not isinstance(entry, dict):
+            return None
+        feedback = {}
+        for field in FEEDBACK_FIELDS:
+            value = entry.get(field)
+            if isinstance(value, list):
+                value = '; '.join(str(item) for item in value)
+            if not isinstance(value, str) or not value.strip():
+                return None
+            feedback[field] = value.strip()
+        return feedback
+    
+    def request_batch_feedback(self, candidates, job_data):
+        """Feedback for several candidates in one chat request.
+        
+        Returns {application_id: feedback} for the entries that came back
+        valid; callers retry the others individually. Raises on API errors
+        so callers can retry the whole batch.
+        """
+        prompt = self.build_batch_feedback_prompt(candidates, job_data)
+        
+        response = self.call_openai(
+            'chat', self.client.chat.completions.create,
+            model=self.model,
+            messages=[
+                {"role": "system", "content": FEEDBACK_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            response_format={"type": "json_object"},
+            temperature=0.7
+        )
+        
+        try:
+            entries = json.loads(response.choices[0].message.content)
+        except json.JSONDecodeError:
+            print(f"⚠️ Batched feedback response for {len(candidates)} candidates was not valid JSON")
+            return {}
+        if isinstance(entries, dict):
+            entries = entries.get('feedback', [])
+        
+        expected = {str(application_id): application_id for application_id, _, _ in candidates}
+        results = {}
+        for entry in entries if isinstance(entries, list) else []:
+            application_id = expected.get(str(entry.get('application_id'))) if isinstance(entry, dict) else None
+            feedback = self.validate_feedback(entry)
+            if application_id is not None and feedback is not None:
+                results[application_id] = feedback
+        return results
+    
+    def request_feedback(self, candidate_data, job_data, scores):
+        """Request feedback from the chat model, raising on API errors so callers can retry"""
+        prompt = self.build_feedback_prompt(candidate_data, job_data, scores)
+        
+        response = self.call_openai(
+            'chat', self.client.chat.completions.create,
+            model=self.model,
+            messages=[
+                {"role": "system", "content": FEEDBACK_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.7
+        )
+        
+        feedback_text = response.choices[0].message.content
+        try:
+            feedback = self.validate_feedback(json.loads(feedback_text))
+        except json.JSONDecodeError:
+            feedback = None
+        if feedback is None:
+            # Fallback if the answer is not JSON with all four fields
+            print("⚠️ Feedback response was not valid feedback JSON, using fallback feedback")
+            FEEDBACK_FALLBACKS.inc(reason='parse')
+            return dict(PARSE_FALLBACK_FEEDBACK)
+        return feedback
+    
+    def default_feedback(self):
+        """Generic feedback used when the chat model cannot be reached"""
+        return dict(DEFAULT_FEEDBACK)
+    
+    def is_fallback_feedback(self, feedback):
+        """True for canned feedback that should not be cached"""
+        return feedback == PARSE_FALLBACK_FEEDBACK or feedback == DEFAULT_FEEDBACK
+    
     def generate_feedback(self, candidate_data, job_data, scores):
         """Generate personalized AI feedback for candidate"""
         try:
-            # Extract relevant information
-            skills = [skill.get('skill_name', '') for skill in candidate_data.get('skills', [])]
-            education = [f"{edu.get('degree', '')} in {edu.get('field_of_study', '')}" 
-                         for edu in candidate_data.get('education', [])]
-            experience = [f"{exp.get('job_title', '')} at {exp.get('company', '')}" 
-                         for exp in candidate_data.get('experience', [])]
-            
-            required_skills = job_data.get('required_skills', [])
-            
-            prompt = f"""
-            As an expert career counselor, provide constructive feedback for a job applicant.
-            
-            Candidate Profile:
-            - Skills: {', '.join(skills)}
-            - Education: {', '.join(education)}
-            - Experience: {', '.join(experience)}
-            
-            Job Requirements:
-            - Required Skills: {', '.join(required_skills)}
-            
-            Scores:
-            - Skill Match: {scores.get('skill_score', 0):.1f}%
-            - Education Match: {scores.get('education_score', 0):.1f}%
-            - Experience Match: {scores.get('experience_score', 0):.1f}%
-            - Total Score: {scores.get('total_score', 0):.1f}%
-            
-            Provide feedback in the following JSON format:
-            {{
-                "strengths": "List the candidate's key strengths for this role",
-                "missing_skills": "Identify important skills that are missing or need improvement",
-                "suggestions": "Provide actionable suggestions for improvement",
-                "overall_assessment": "Give an overall assessment of fit for this role"
-            }}
-            
-            Be encouraging but realistic. Focus on specific, actionable advice.
-            """
-            
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are an expert career counselor providing constructive feedback."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7
-            )
-            
-            feedback_text = response.choices[0].message.content
-            try:
-                return json.loads(feedback_text)
-            except json.JSONDecodeError:
-                # Fallback if JSON parsing fails
-                return {
-                    "strengths": "Your experience shows relevant background",
-                    "missing_skills": "Consider developing additional technical skills",
-                    "suggestions": "Focus on gaining more hands-on experience",
-                    "overall_assessment": "Continue developing your skills for better alignment"
-                }
-                
+            return self.request_feedback(candidate_data, job_data, scores)
         except Exception as e:
             print(f"Error generating feedback: {e}")
-            return {
-                "strengths": "Your application has been reviewed",
-                "missing_skills": "Review the job requirements for skill gaps",
-                "suggestions": "Continue learning and gaining experience",
-                "overall_assessment": "Thank you for your interest in this position"
-            }
+            FEEDBACK_FALLBACKS.inc(reason='error')
+            return self.default_feedback()
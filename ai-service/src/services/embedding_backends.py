@@ -0,0 +1,180 @@
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+
+import numpy as np
+
+from services.embedding_cache import normalize_text
+from services.metrics import EMBEDDING_BATCH_SIZE, record_run_stage
+
+
+class OpenAIEmbeddingBackend:
+    """Embeddings from the OpenAI API, many texts per request.
+
+    Requests go through AIService.call_openai (metrics) on its shared client
+    and give up after `timeout` seconds, so a slow provider surfaces as an
+    error the caller can fall back from.
+    """
+
+    remote = True
+
+    def __init__(self, ai_service, model='text-embedding-ada-002', timeout=10.0):
+        self.ai_service = ai_service
+        self.model = model
+        self.timeout = timeout
+        self.name = model
+
+    def embed(self, texts):
+        """One vector per text, in order; raises on API errors"""
+        response = self.ai_service.call_openai(
+            'embedding', self.ai_service.client.embeddings.create,
+            model=self.model,
+            input=list(texts),
+            timeout=self.timeout
+        )
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+
+class HashedNgramBackend:
+    """Local embeddings from hashed word and character n-grams.
+
+    Each text's word unigrams/bigrams and character n-grams (of the padded
+    words) are hashed with CRC32 into `dim` signed buckets, counts are
+    dampened with log1p and the vector is L2-normalized. No network, no
+    fitted vocabulary, and stable across processes, so vectors can be cached
+    and compared like remote ones. Similar spellings ("postgres" /
+    "postgresql") land close together; synonyms with no shared n-grams do not.
+    """
+
+    remote = False
+
+    def __init__(self, dim=512, char_ngrams=(3, 5), word_ngrams=2):
+        self.dim = dim
+        self.char_ngrams = char_ngrams
+        self.word_ngrams = word_ngrams
+        self.name = f"hashed-ngram-{dim}-c{char_ngrams[0]}{char_ngrams[1]}-w{word_ngrams}"
+
+    def features(self, text):
+        words = normalize_text(text).split()
+        grams = []
+        for size in range(1, self.word_ngrams + 1):
+            grams.extend('w:' + ' '.join(words[start:start + size]) for start in range(len(words) - size + 1))
+        low, high = self.char_ngrams
+        for word in words:
+            padded = f" {word} "
+            for size in range(low, high + 1):
+                grams.extend('c:' + padded[start:start + size] for start in range(max(len(padded) - size + 1, 1)))
+        return grams
+
+    def embed_one(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        hashes = np.array([zlib.crc32(gram.encode('utf-8')) for gram in self.features(text)], dtype=np.uint64)
+        if not len(hashes):
+            return vector
+        signs = np.where(hashes & (1 << 31), -1.0, 1.0).astype(np.float32)
+        np.add.at(vector, (hashes % self.dim).astype(np.int64), signs)
+        vector = np.sign(vector) * np.log1p(np.abs(vector))
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed(self, texts):
+        return [self.embed_one(text) for text in texts]
+
+
+class EmbeddingBatcher:
+    """Coalesces concurrent embedding requests into batched backend calls.
+
+    Callers block in embed(texts). A dispatcher thread collects the texts of
+    every waiting caller until `max_batch_size` distinct texts are pending or
+    the oldest has waited `max_wait` seconds, then makes one backend call and
+    hands each caller its vectors. Identical texts requested concurrently
+    share one slot; a failed call fails every caller in that batch.
+
+    The backend call runs on the dispatcher thread, so a caller's wait is
+    added to its own RunTimer as `stage` (e.g. 'openai_embedding').
+    """
+
+    remote = True
+
+    def __init__(self, backend, max_batch_size=256, max_wait=0.01, stage=None):
+        self.backend = backend
+        self.stage = stage
+        self.name = backend.name
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._pending = {}
+        self._first_pending_at = None
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def _ensure_dispatcher(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._dispatch, name='embedding-batcher', daemon=True)
+            self._thread.start()
+
+    def embed(self, texts):
+        """One vector per text, in order; raises the backend's error if its batch failed"""
+        started = time.perf_counter()
+        futures = []
+        with self._condition:
+            self._ensure_dispatcher()
+            for text in texts:
+                future = self._pending.get(text)
+                if future is None:
+                    future = self._pending[text] = Future()
+                    if self._first_pending_at is None:
+                        self._first_pending_at = time.monotonic()
+                futures.append(future)
+            self._condition.notify()
+        try:
+            return [future.result() for future in futures]
+        finally:
+            if self.stage:
+                record_run_stage(self.stage, time.perf_counter() - started)
+
+    def _next_batch(self):
+        with self._condition:
+            while True:
+                if self._pending:
+                    waited = time.monotonic() - self._first_pending_at
+                    if len(self._pending) >= self.max_batch_size or waited >= self.max_wait:
+                        break
+                    self._condition.wait(self.max_wait - waited)
+                else:
+                    self._condition.wait()
+
+            texts = list(self._pending)[:self.max_batch_size]
+            batch = [(text, self._pending.pop(text)) for text in texts]
+            self._first_pending_at = time.monotonic() if self._pending else None
+            return batch
+
+    def _dispatch(self):
+        while True:
+            batch = self._next_batch()
+            EMBEDDING_BATCH_SIZE.observe(len(batch))
+            try:
+                vectors = self.backend.embed([text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+
+def create_embedding_backend(name, ai_service, embedding_model, timeout=10.0, local_dim=512,
+                             max_batch_size=256, max_wait=0.01):
+    """Backend for an EMBEDDING_BACKEND / EMBEDDING_FALLBACK setting ('openai', 'local' or '')"""
+    if not name:
+        return None
+    if name == 'openai':
+        return EmbeddingBatcher(
+            OpenAIEmbeddingBackend(ai_service, embedding_model, timeout=timeout),
+            max_batch_size=max_batch_size,
+            max_wait=max_wait,
+            stage='openai_embedding'
+        )
+    if name == 'local':
+        return HashedNgramBackend(dim=local_dim)
+    raise ValueError(f"Unknown embedding backend '{name}'")
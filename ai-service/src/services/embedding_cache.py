@@ -0,0 +1,141 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def normalize_text(text):
+    """Normalize text so trivially different inputs share a cache entry"""
+    return ' '.join(str(text).lower().split())
+
+
+def embedding_key(model, text):
+    """Content-addressed cache key for a (model, text) pair"""
+    digest = hashlib.sha256(f"{model}\x00{normalize_text(text)}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+class EmbeddingCache:
+    """Two-tier embedding cache: in-process LRU backed by SQLite on disk.
+
+    Entries are keyed by model name and a hash of the normalized text, so the
+    same job requirements or common skill sets are only embedded once and the
+    vectors survive service restarts. The SQLite file is opened on first use
+    in each process, so a cache created before a fork (gunicorn --preload)
+    never shares its connection with the children.
+    """
+
+    def __init__(self, path=None, max_entries=10000):
+        self.path = path
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = None
+        self._disk_pid = None
+        self._disk_failed = False
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _disk_store(self):
+        """This process's SQLite connection, opened on first use; None if there is no disk tier"""
+        if self.path and not self._disk_failed and self._disk_pid != os.getpid():
+            self._disk_pid = os.getpid()
+            self._open_disk(self.path)
+        return self._disk
+
+    def _open_disk(self, path):
+        try:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            self._disk = sqlite3.connect(path, check_same_thread=False)
+            self._disk.execute('PRAGMA journal_mode=WAL')
+            self._disk.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    dim INTEGER NOT NULL,
+                    vector BLOB NOT NULL
+                )
+            """)
+            self._disk.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️ Embedding cache disk store unavailable, using memory only: {e}")
+            self._disk = None
+            self._disk_failed = True
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, model, text):
+        """Return the cached vector for (model, text) or None"""
+        key = embedding_key(model, text)
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return vector
+
+            disk = self._disk_store()
+            if disk is not None:
+                row = disk.execute(
+                    'SELECT vector FROM embeddings WHERE key = ?', (key,)
+                ).fetchone()
+                if row:
+                    vector = np.frombuffer(row[0], dtype=np.float32)
+                    self._remember(key, vector)
+                    self.disk_hits += 1
+                    return vector
+
+            self.misses += 1
+            return None
+
+    def put(self, model, text, vector):
+        """Store a vector in both tiers"""
+        key = embedding_key(model, text)
+        vector = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            self._remember(key, vector)
+            disk = self._disk_store()
+            if disk is not None:
+                try:
+                    disk.execute(
+                        'INSERT OR REPLACE INTO embeddings (key, model, dim, vector) VALUES (?, ?, ?, ?)',
+                        (key, model, int(vector.shape[0]), vector.tobytes())
+                    )
+                    disk.commit()
+                except sqlite3.Error as e:
+                    print(f"⚠️ Failed to persist embedding: {e}")
+        return vector
+
+    def stats(self):
+        """Hit/miss counters for both tiers"""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_entries': len(self._memory),
+                'max_entries': self.max_entries,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                'persistent': bool(self.path) and not self._disk_failed
+            }
+
+    def close(self):
+        with self._lock:
+            if self._disk is not None and self._disk_pid == os.getpid():
+                self._disk.close()
+            self._disk = None
+            self._disk_pid = None
@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+def requirements_hash(job_data):
+    """Stable hash of a job's required skills, education and experience"""
+    requirements = {
+        'required_skills': job_data.get('required_skills'),
+        'required_education': job_data.get('required_education'),
+        'required_experience': job_data.get('required_experience')
+    }
+    return hashlib.sha256(json.dumps(requirements, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def score_bucket(scores, width=10):
+    """Coarse score signature so tiny score changes reuse the same feedback"""
+    return ':'.join(
+        str(int(float(scores.get(name, 0)) // width))
+        for name in ('skill_score', 'education_score', 'experience_score', 'total_score')
+    )
+
+
+class FeedbackCache:
+    """SQLite-backed cache of generated feedback with TTL and LRU eviction.
+
+    Keys combine the resume hash, the job requirements hash, a score bucket,
+    the chat model and the prompt version, so identical resumes re-ranked
+    against an unchanged job never reach the LLM twice. The SQLite file is
+    opened on first use in each process, never inherited across a fork.
+    SQLite errors (locked, unwritable or corrupt file, full disk) are logged
+    once and turn lookups into misses and writes into no-ops.
+    """
+
+    def __init__(self, path=None, ttl_seconds=7 * 24 * 3600, max_entries=50000, bucket_width=10):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.bucket_width = bucket_width
+        self._lock = threading.Lock()
+        self._puts = 0
+
+        self.hits = 0
+        self.misses = 0
+
+        self._db = None
+        self._db_pid = None
+        self._failed = False
+
+    def _connection(self):
+        """This process's SQLite connection, opened (and the table created) on first use"""
+        if self._db_pid != os.getpid():
+            self._db_pid = os.getpid()
+            self._db = None
+            try:
+                self._open()
+            except (sqlite3.Error, OSError) as e:
+                self._warn(e)
+                self._db = None
+        return self._db
+
+    def _open(self):
+        if self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._db = sqlite3.connect(self.path or ':memory:', check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS feedback_cache (
+                key TEXT PRIMARY KEY,
+                job_id INTEGER,
+                requirements_hash TEXT NOT NULL,
+                feedback TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL
+            )
+        """)
+        self._db.execute('CREATE INDEX IF NOT EXISTS idx_feedback_cache_job ON feedback_cache (job_id)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS idx_feedback_cache_used ON feedback_cache (last_used_at)')
+        self._db.commit()
+
+    def _warn(self, error):
+        if not self._failed:
+            self._failed = True
+            print(f"⚠️ Feedback cache unavailable, generating feedback uncached: {error}")
+
+    def make_key(self, resume_hash, job_requirements_hash, scores, model, prompt_version):
+        parts = [
+            resume_hash or '',
+            job_requirements_hash,
+            score_bucket(scores, self.bucket_width),
+            model,
+            str(prompt_version)
+        ]
+        return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Return cached feedback for a key, or None if missing or expired"""
+        now = time.time()
+        with self._lock:
+            db = self._connection()
+            if db is None:
+                self.misses += 1
+                return None
+            try:
+                row = db.execute(
+                    'SELECT feedback, created_at FROM feedback_cache WHERE key = ?', (key,)
+                ).fetchone()
+                if not row or now - row[1] > self.ttl_seconds:
+                    self.misses += 1
+                    return None
+                db.execute('UPDATE feedback_cache SET last_used_at = ? WHERE key = ?', (now, key))
+                db.commit()
+            except sqlite3.Error as e:
+                self._warn(e)
+                self.misses += 1
+                return None
+            self.hits += 1
+            return json.loads(row[0])
+
+    def put(self, key, job_id, job_requirements_hash, feedback):
+        now = time.time()
+        with self._lock:
+            db = self._connection()
+            if db is None:
+                return
+            try:
+                db.execute("""
+                    INSERT OR REPLACE INTO feedback_cache
+                    (key, job_id, requirements_hash, feedback, created_at, last_used_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, (key, job_id, job_requirements_hash, json.dumps(feedback), now, now))
+                db.commit()
+                self._puts += 1
+                if self._puts % 100 == 0:
+                    self._evict(now)
+            except sqlite3.Error as e:
+                self._warn(e)
+
+    def _evict(self, now):
+        self._db.execute('DELETE FROM feedback_cache WHERE created_at < ?', (now - self.ttl_seconds,))
+        count = self._db.execute('SELECT COUNT(*) FROM feedback_cache').fetchone()[0]
+        if count > self.max_entries:
+            self._db.execute("""
+                DELETE FROM feedback_cache WHERE key IN (
+                    SELECT key FROM feedback_cache ORDER BY last_used_at ASC LIMIT ?
+                )
+            """, (count - self.max_entries,))
+        self._db.commit()
+
+    def invalidate_job(self, job_id):
+        """Drop all cached feedback generated for a job, e.g. after its requirements are edited"""
+        with self._lock:
+            db = self._connection()
+            if db is None:
+                return 0
+            try:
+                cursor = db.execute('DELETE FROM feedback_cache WHERE job_id = ?', (job_id,))
+                db.commit()
+            except sqlite3.Error as e:
+                self._warn(e)
+                return 0
+            return cursor.rowcount
+
+    def stats(self):
+        with self._lock:
+            db = self._connection()
+            try:
+                entries = db.execute('SELECT COUNT(*) FROM feedback_cache').fetchone()[0] if db else 0
+            except sqlite3.Error as e:
+                self._warn(e)
+                entries = 0
+            lookups = self.hits + self.misses
+            return {
+                'entries': entries,
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
@@ -0,0 +1,194 @@
+import random
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+
+from services.ai_service import feedback_prompt_variant
+from services.metrics import FEEDBACK_BATCH_ENTRIES, FEEDBACK_FALLBACKS, FEEDBACK_RETRIES
+
+# Rough completion budget reserved per feedback request
+FEEDBACK_COMPLETION_TOKENS = 400
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at a per-minute rate"""
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount=1):
+        """Block until `amount` tokens are available and take them"""
+        amount = min(amount, self.capacity)
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait_seconds = (amount - self.tokens) / self.rate
+            time.sleep(wait_seconds)
+
+
+class RateLimiter:
+    """Shared requests-per-minute and tokens-per-minute limits for the chat API.
+
+    A limit of 0 disables that bucket.
+    """
+
+    def __init__(self, requests_per_minute=0, tokens_per_minute=0):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+    def acquire(self, tokens=0):
+        if self.requests:
+            self.requests.acquire(1)
+        if self.tokens and tokens:
+            self.tokens.acquire(tokens)
+
+
+def is_retryable(error):
+    """Rate limits, server errors and transport failures are worth retrying"""
+    # Errors can only be openai's if the (lazily imported) package is loaded
+    openai = sys.modules.get('openai')
+    if openai is not None and isinstance(error, (openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    status = getattr(error, 'status_code', None) or getattr(error, 'http_status', None)
+    return status is not None and (status == 429 or status >= 500)
+
+
+def retry_after(error):
+    """Seconds requested by the provider's Retry-After header, if any"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+class FeedbackWorkerPool:
+    """Bounded pool of threads generating LLM feedback under a shared rate limit.
+
+    Requests that fail with 429/5xx or transport errors are retried with
+    jittered exponential backoff; anything else falls back to the generic
+    feedback from AIService. Several candidates can share one request
+    (generate_batch); entries missing from its answer are generated one by
+    one.
+    """
+
+    def __init__(self, ai_service, max_workers=4, rate_limiter=None,
+                 max_retries=5, base_delay=1.0, max_delay=30.0):
+        self.ai_service = ai_service
+        self.max_workers = max_workers
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='feedback')
+
+    def estimate_tokens(self, candidate_data, job_data, scores):
+        """Approximate prompt plus completion tokens for rate limiting"""
+        prompt = self.ai_service.build_feedback_prompt(candidate_data, job_data, scores)
+        return len(prompt) // 4 + FEEDBACK_COMPLETION_TOKENS
+
+    def with_retries(self, request, tokens):
+        """Call `request()` under the rate limit, retrying transient API failures.
+
+        Returns (True, result), or (False, retryable) once retries are
+        exhausted or the error is not worth retrying.
+        """
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter:
+                self.rate_limiter.acquire(tokens)
+            try:
+                return True, request()
+            except Exception as e:
+                retryable = is_retryable(e)
+                if attempt >= self.max_retries or not retryable:
+                    print(f"Error generating feedback: {e}")
+                    return False, retryable
+                FEEDBACK_RETRIES.inc()
+                delay = retry_after(e)
+                if delay is None:
+                    delay = min(self.max_delay, self.base_delay * (2 ** attempt)) * random.uniform(0.5, 1.0)
+                time.sleep(delay)
+
+    def generate(self, candidate_data, job_data, scores):
+        """Generate feedback for one candidate, retrying transient API failures"""
+        tokens = self.estimate_tokens(candidate_data, job_data, scores)
+        succeeded, result = self.with_retries(
+            lambda: self.ai_service.request_feedback(candidate_data, job_data, scores), tokens
+        )
+        if succeeded:
+            return result
+        FEEDBACK_FALLBACKS.inc(reason='retries_exhausted' if result else 'error')
+        return self.ai_service.default_feedback()
+
+    def generate_batch(self, items, job_data):
+        """Feedback for several (key, candidate_data, scores) items of one job in one request.
+
+        Keys are the application IDs the model is asked to answer for.
+        Returns [(key, feedback, prompt_variant)]; entries that are missing
+        or fail validation (or the whole batch, if the request fails) are
+        generated individually, with the single-candidate prompt variant.
+        """
+        if len(items) == 1:
+            key, candidate_data, scores = items[0]
+            return [(key, self.generate(candidate_data, job_data, scores), feedback_prompt_variant())]
+
+        prompt = self.ai_service.build_batch_feedback_prompt(items, job_data)
+        tokens = len(prompt) // 4 + FEEDBACK_COMPLETION_TOKENS * len(items)
+        succeeded, answered = self.with_retries(
+            lambda: self.ai_service.request_batch_feedback(items, job_data), tokens
+        )
+        answered = answered if succeeded else {}
+        FEEDBACK_BATCH_ENTRIES.inc(len(answered), outcome='valid')
+        FEEDBACK_BATCH_ENTRIES.inc(len(items) - len(answered), outcome='retried')
+
+        results = []
+        for key, candidate_data, scores in items:
+            feedback = answered.get(key)
+            if feedback is None:
+                results.append((key, self.generate(candidate_data, job_data, scores), feedback_prompt_variant()))
+            else:
+                results.append((key, feedback, feedback_prompt_variant(batched=True)))
+        return results
+
+    def imap_unordered(self, items, job_data, max_in_flight=None, batch_size=1):
+        """Generate feedback for (key, candidate_data, scores) items.
+
+        Yields (key, feedback, prompt_variant) as requests complete. With `batch_size` > 1,
+        up to that many items share one request (see generate_batch). At
+        most `max_in_flight` requests are pending at once, so the input can
+        be a lazy stream.
+        """
+        max_in_flight = max_in_flight or self.max_workers * 2
+        items = iter(items)
+        pending = set()
+        exhausted = False
+
+        while pending or not exhausted:
+            while not exhausted and len(pending) < max_in_flight:
+                batch = list(islice(items, batch_size))
+                if not batch:
+                    exhausted = True
+                    break
+                pending.add(self.executor.submit(self.generate_batch, batch, job_data))
+
+            if not pending:
+                break
+
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
@@ -0,0 +1,300 @@
+import json
+import threading
+import time
+
+import numpy as np
+
+from services.feedback_cache import requirements_hash
+
+
+class JobVectorIndex:
+    """In-memory index of normalized job requirement vectors.
+
+    Search is exact brute force (one matrix-vector product) by default. With
+    `partitions` > 0 the index also keeps an IVF-style partitioning: vectors
+    are clustered with k-means and a query only scans the `probes` nearest
+    partitions. Rows are stored contiguously; removal swaps the last row in.
+    """
+
+    def __init__(self, partitions=0, probes=4, min_train_size=None):
+        self.partitions = partitions
+        self.probes = probes
+        self.min_train_size = min_train_size or partitions * 8
+        self._ids = []
+        self._rows = {}
+        self._matrix = None
+        self._assignments = np.zeros(0, dtype=np.int64)
+        self._centroids = None
+        self._trained_size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, job_id):
+        return job_id in self._rows
+
+    def _ensure_capacity(self, dim):
+        if self._matrix is None:
+            self._matrix = np.zeros((16, dim), dtype=np.float32)
+            self._assignments = np.zeros(16, dtype=np.int64)
+        elif len(self._ids) >= self._matrix.shape[0]:
+            capacity = self._matrix.shape[0] * 2
+            matrix = np.zeros((capacity, dim), dtype=np.float32)
+            matrix[:len(self._ids)] = self._matrix[:len(self._ids)]
+            assignments = np.zeros(capacity, dtype=np.int64)
+            assignments[:len(self._ids)] = self._assignments[:len(self._ids)]
+            self._matrix, self._assignments = matrix, assignments
+
+    def _nearest_partition(self, vector):
+        return int(np.argmax(self._centroids @ vector))
+
+    def upsert(self, job_id, vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            row = self._rows.get(job_id)
+            if row is None:
+                self._ensure_capacity(vector.shape[0])
+                row = len(self._ids)
+                self._ids.append(job_id)
+                self._rows[job_id] = row
+            self._matrix[row] = vector
+            if self._centroids is not None:
+                self._assignments[row] = self._nearest_partition(vector)
+            retrain = self.partitions and len(self._ids) >= max(self.min_train_size, self._trained_size * 2)
+        if retrain:
+            self.train()
+
+    def remove(self, job_id):
+        with self._lock:
+            row = self._rows.pop(job_id, None)
+            if row is None:
+                return
+            last = len(self._ids) - 1
+            if row != last:
+                moved = self._ids[last]
+                self._ids[row] = moved
+                self._rows[moved] = row
+                self._matrix[row] = self._matrix[last]
+                self._assignments[row] = self._assignments[last]
+            self._ids.pop()
+
+    def train(self, iterations=10, seed=0):
+        """Cluster the indexed vectors into `partitions` groups with spherical k-means"""
+        with self._lock:
+            size = len(self._ids)
+            if not self.partitions or size < self.partitions:
+                return
+            vectors = self._matrix[:size]
+            rng = np.random.default_rng(seed)
+            centroids = vectors[rng.choice(size, self.partitions, replace=False)].copy()
+            for _ in range(iterations):
+                assignments = np.argmax(vectors @ centroids.T, axis=1)
+                for partition in range(self.partitions):
+                    members = vectors[assignments == partition]
+                    if len(members):
+                        centroid = members.mean(axis=0)
+                        norm = np.linalg.norm(centroid)
+                        centroids[partition] = centroid / norm if norm else centroid
+            self._centroids = centroids
+            self._assignments[:size] = np.argmax(vectors @ centroids.T, axis=1)
+            self._trained_size = size
+
+    def search(self, vector, k=50, restrict=None):
+        """Top-k (job_id, similarity) pairs; `restrict` limits results to a set of job IDs"""
+        vector = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            size = len(self._ids)
+            if not size:
+                return []
+            rows = np.arange(size)
+            if self._centroids is not None:
+                probes = np.argsort(-(self._centroids @ vector))[:self.probes]
+                rows = rows[np.isin(self._assignments[:size], probes)]
+            if restrict is not None:
+                rows = np.array([row for row in rows if self._ids[row] in restrict], dtype=np.int64)
+            if not len(rows):
+                return []
+            similarities = self._matrix[rows] @ vector
+            top = np.argsort(-similarities)[:k]
+            return [(self._ids[rows[position]], float(similarities[position])) for position in top]
+
+
+class JobMatcher:
+    """Recommends the best-fit open jobs for a candidate.
+
+    Published jobs are kept in a JobVectorIndex of requirement embeddings and
+    an inverted skill index for keyword prefiltering; both are synced
+    incrementally from the jobs table by updated_at. Deleted rows leave no
+    updated_at behind, so every `reconcile_interval` seconds the indexed IDs
+    are also checked against the published job IDs. Only the shortlisted
+    jobs are scored with the full ScoringEngine.
+    """
+
+    JOB_COLUMNS = "id, title, status, required_skills, required_education, required_experience, updated_at"
+
+    def __init__(self, database, ai_service, scoring_engine, index=None, refresh_interval=30,
+                 reconcile_interval=300):
+        self.db = database
+        self.ai_service = ai_service
+        self.scoring_engine = scoring_engine
+        self.index = index or JobVectorIndex()
+        self.refresh_interval = refresh_interval
+        self.reconcile_interval = reconcile_interval
+        self._profiles = {}
+        self._skill_jobs = {}
+        self._unembedded = set()
+        self._watermark = None
+        self._last_refresh = 0.0
+        self._last_reconcile = 0.0
+        self._lock = threading.Lock()
+
+    def _decode(self, row):
+        job_data = dict(row)
+        for column in ('required_skills', 'required_education', 'required_experience'):
+            if isinstance(job_data[column], str):
+                job_data[column] = json.loads(job_data[column])
+        job_data['requirements_hash'] = requirements_hash(job_data)
+        return job_data
+
+    def _embed(self, job_id, job_data):
+        """Add a job's requirement vector to the index; returns whether it could be embedded"""
+        vector = self.ai_service.skill_vectors.centroid(job_data['required_skills'])
+        with self._lock:
+            if vector is None:
+                self._unembedded.add(job_id)
+                return False
+            self._unembedded.discard(job_id)
+        self.index.upsert(job_id, vector)
+        return True
+
+    def upsert_job(self, job_id, job_data):
+        """Index or re-index a published job"""
+        previous = self._profiles.get(job_id)
+        if previous and previous.job_data.get('requirements_hash') == job_data['requirements_hash']:
+            if job_id not in self.index:
+                self._embed(job_id, previous.job_data)
+            return
+        self.remove_job(job_id)
+        self._embed(job_id, job_data)
+
+        profile = self.scoring_engine.compile(job_data)
+        with self._lock:
+            self._profiles[job_id] = profile
+            for skill_id in profile.required_ids:
+                self._skill_jobs.setdefault(skill_id, set()).add(job_id)
+
+    def remove_job(self, job_id):
+        self.index.remove(job_id)
+        with self._lock:
+            self._unembedded.discard(job_id)
+            profile = self._profiles.pop(job_id, None)
+            if profile:
+                for skill_id in profile.required_ids:
+                    jobs = self._skill_jobs.get(skill_id)
+                    if jobs:
+                        jobs.discard(job_id)
+
+    def sync_job(self, job_id):
+        """Re-read one job and index or drop it; returns whether it is indexed"""
+        rows = self.db.execute_query(f"""
+            SELECT {self.JOB_COLUMNS} FROM jobs WHERE id = %s
+        """, (job_id,))
+        if rows and rows[0]['status'] == 'published':
+            self.upsert_job(job_id, self._decode(rows[0]))
+            return True
+        self.remove_job(job_id)
+        return False
+
+    def reconcile(self):
+        """Drop indexed jobs that are no longer published, e.g. deleted rows"""
+        rows = self.db.execute_query("SELECT id FROM jobs WHERE status = 'published'")
+        published = {row['id'] for row in rows}
+        with self._lock:
+            stale = [job_id for job_id in self._profiles if job_id not in published]
+        for job_id in stale:
+            self.remove_job(job_id)
+        self._last_reconcile = time.monotonic()
+        return len(stale)
+
+    def refresh(self, force=False):
+        """Apply job changes since the last sync; cheap when nothing changed"""
+        now = time.monotonic()
+        if not force and now - self._last_refresh < self.refresh_interval:
+            return
+        if self._watermark is not None and (force or now - self._last_reconcile >= self.reconcile_interval):
+            self.reconcile()
+        if self._watermark is None:
+            self._last_reconcile = now
+            rows = self.db.execute_query(f"""
+                SELECT {self.JOB_COLUMNS} FROM jobs WHERE status = 'published'
+            """)
+        else:
+            rows = self.db.execute_query(f"""
+                SELECT {self.JOB_COLUMNS} FROM jobs WHERE updated_at >= %s
+            """, (self._watermark,))
+
+        for row in rows:
+            if row['status'] == 'published':
+                self.upsert_job(row['id'], self._decode(row))
+            else:
+                self.remove_job(row['id'])
+            if row['updated_at'] and (self._watermark is None or row['updated_at'] > self._watermark):
+                self._watermark = row['updated_at']
+
+        # Jobs whose requirements could not be embedded last time (e.g. the
+        # embedding API was down) are retried until they get a vector
+        with self._lock:
+            unembedded = [(job_id, self._profiles[job_id].job_data)
+                          for job_id in self._unembedded if job_id in self._profiles]
+        for job_id, job_data in unembedded:
+            self._embed(job_id, job_data)
+
+        if self._watermark is None:
+            # Nothing published yet; later syncs pick up jobs from now on
+            self._watermark = self.db.execute_query("SELECT NOW() AS now")[0]['now']
+        self._last_refresh = time.monotonic()
+
+    def shortlist(self, candidate_data, size=50, exclude=()):
+        """Jobs worth fully scoring: keyword matches first, then nearest by vector"""
+        record = self.scoring_engine.skill_record(candidate_data)
+        with self._lock:
+            keyword_jobs = set()
+            for skill_id in record.ids:
+                keyword_jobs |= self._skill_jobs.get(skill_id, set())
+        keyword_jobs -= set(exclude)
+
+        skill_names = [skill.get('skill_name', '') for skill in candidate_data.get('skills') or []]
+        vector = self.ai_service.skill_vectors.centroid(skill_names) if skill_names else None
+
+        shortlisted = []
+        if vector is not None:
+            shortlisted = [job_id for job_id, _ in self.index.search(vector, size, restrict=keyword_jobs)]
+            # Keyword matches without a vector yet cannot come back from the index
+            shortlisted += [job_id for job_id in keyword_jobs if job_id not in self.index][:size - len(shortlisted)]
+            if len(shortlisted) < size:
+                for job_id, _ in self.index.search(vector, size + len(exclude) + len(shortlisted)):
+                    if job_id not in exclude and job_id not in shortlisted:
+                        shortlisted.append(job_id)
+                    if len(shortlisted) >= size:
+                        break
+        else:
+            shortlisted = list(keyword_jobs)[:size]
+        return shortlisted
+
+    def recommend(self, candidate_data, k=5, shortlist_size=50, exclude=()):
+        """Top-k open jobs for a candidate as dicts with the full score breakdown"""
+        self.refresh()
+        results = []
+        for job_id in self.shortlist(candidate_data, shortlist_size, exclude):
+            profile = self._profiles.get(job_id)
+            if profile is None:
+                continue
+            scores = self.scoring_engine.score_batch(profile, [candidate_data])
+            results.append({
+                'job_id': job_id,
+                'title': profile.job_data.get('title'),
+                **{name: round(float(values[0]), 2) for name, values in scores.items()}
+            })
+        results.sort(key=lambda result: result['total_score'], reverse=True)
+        return results[:k]
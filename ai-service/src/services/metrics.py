@@ -0,0 +1,365 @@
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """A named family of samples keyed by label values"""
+
+    type = 'untyped'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def describe(self):
+        return {'type': self.type, 'help': self.documentation, 'labelnames': self.labelnames}
+
+    def samples(self):
+        with self._lock:
+            return {key: (list(value) if isinstance(value, list) else value) for key, value in self._values.items()}
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    """Cumulative-bucket histogram; each sample is [bucket counts..., sum, count]"""
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def describe(self):
+        return {**super().describe(), 'buckets': self.buckets}
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            sample = self._values.get(key)
+            if sample is None:
+                sample = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    sample[position] += 1
+            sample[-2] += value
+            sample[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+
+class MetricsRegistry:
+    """Process-wide metrics rendered in the Prometheus text format.
+
+    Besides its own counters, gauges and histograms, the registry evaluates
+    collector callbacks at scrape time (for stats kept elsewhere, like cache
+    hit counts) and adds snapshots pushed by other processes, e.g. embedded
+    ranking workers, summing samples with the same labels.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._remote = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, documentation, labels, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labels, **kwargs)
+            return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self._register(Counter, name, documentation, labels)
+
+    def gauge(self, name, documentation, labels=()):
+        return self._register(Gauge, name, documentation, labels)
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, documentation, labels, buckets=buckets)
+
+    def collector(self, collect):
+        """Register `collect()` returning (name, type, help, labelnames, {label values: value}) tuples"""
+        with self._lock:
+            self._collectors.append(collect)
+        return collect
+
+    def snapshot(self):
+        """Picklable {name: description + samples} of everything this process recorded"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+
+        snapshot = {metric.name: {**metric.describe(), 'samples': metric.samples()} for metric in metrics}
+        for collect in collectors:
+            try:
+                for name, metric_type, documentation, labelnames, samples in collect():
+                    snapshot[name] = {
+                        'type': metric_type, 'help': documentation,
+                        'labelnames': tuple(labelnames), 'samples': dict(samples)
+                    }
+            except Exception as e:
+                print(f"⚠️ Metrics collector failed: {e}")
+        return snapshot
+
+    def merge(self, source, snapshot):
+        """Replace the latest snapshot pushed by another process"""
+        with self._lock:
+            self._remote[source] = snapshot
+
+    def listen(self, channel):
+        """Merge (source, snapshot) messages from a multiprocessing queue in a daemon thread"""
+        def pump():
+            while True:
+                try:
+                    source, snapshot = channel.get()
+                    self.merge(source, snapshot)
+                except (EOFError, OSError):
+                    return
+                except Exception as e:
+                    print(f"⚠️ Metrics snapshot dropped: {e}")
+
+        thread = threading.Thread(target=pump, name='metrics-listener', daemon=True)
+        thread.start()
+        return thread
+
+    def push_periodically(self, channel, source, interval=5.0):
+        """Send this process's snapshot to a parent's registry every `interval` seconds"""
+        def push():
+            while True:
+                time.sleep(interval)
+                try:
+                    channel.put_nowait((source, self.snapshot()))
+                except Exception as e:
+                    print(f"⚠️ Failed to push metrics: {e}")
+
+        thread = threading.Thread(target=push, name='metrics-push', daemon=True)
+        thread.start()
+        return thread
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        combined = self.snapshot()
+        with self._lock:
+            remote = list(self._remote.values())
+        for snapshot in remote:
+            for name, family in snapshot.items():
+                target = combined.setdefault(name, {**family, 'samples': {}})
+                for key, value in family['samples'].items():
+                    current = target['samples'].get(key)
+                    if current is None:
+                        target['samples'][key] = value
+                    elif isinstance(value, list):
+                        target['samples'][key] = [a + b for a, b in zip(current, value)]
+                    else:
+                        target['samples'][key] = current + value
+
+        lines = []
+        for name in sorted(combined):
+            family = combined[name]
+            lines.append(f"# HELP {name} {family['help']}")
+            lines.append(f"# TYPE {name} {family['type']}")
+            labelnames = family['labelnames']
+            for key, value in sorted(family['samples'].items()):
+                if family['type'] == 'histogram':
+                    for bound, count in zip(family['buckets'], value):
+                        labels = _format_labels(labelnames, key, [('le', _format_value(float(bound)))])
+                        lines.append(f"{name}_bucket{labels} {count}")
+                    labels = _format_labels(labelnames, key, [('le', '+Inf')])
+                    lines.append(f"{name}_bucket{labels} {value[-1]}")
+                    lines.append(f"{name}_sum{_format_labels(labelnames, key)} {_format_value(value[-2])}")
+                    lines.append(f"{name}_count{_format_labels(labelnames, key)} {value[-1]}")
+                else:
+                    lines.append(f"{name}{_format_labels(labelnames, key)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port, host='0.0.0.0'):
+        """Expose /metrics on a background HTTP server (for processes without Flask)"""
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+        return server
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    'ai_service_stage_seconds', 'Time spent per ranking pipeline stage (stages can nest)', ['stage']
+)
+RANKING_RUNS = registry.counter(
+    'ai_service_ranking_runs_total', 'Ranking runs by outcome (a requeued run counts again when it ends)', ['status']
+)
+CANDIDATES_SCORED = registry.counter('ai_service_candidates_scored_total', 'Applications scored by ranking runs')
+DB_QUERIES = registry.counter('ai_service_db_queries_total', 'Database statements and transactions', ['statement'])
+DB_QUERY_SECONDS = registry.histogram(
+    'ai_service_db_query_seconds', 'Database statement and transaction latency', ['statement']
+)
+DB_ERRORS = registry.counter('ai_service_db_errors_total', 'Database statements that raised', ['statement'])
+OPENAI_REQUESTS = registry.counter(
+    'ai_service_openai_requests_total', 'OpenAI API requests', ['operation', 'outcome']
+)
+OPENAI_REQUEST_SECONDS = registry.histogram(
+    'ai_service_openai_request_seconds', 'OpenAI API request latency', ['operation']
+)
+OPENAI_TOKENS = registry.counter('ai_service_openai_tokens_total', 'OpenAI tokens used', ['operation', 'kind'])
+EMBEDDING_BATCH_SIZE = registry.histogram(
+    'ai_service_embedding_batch_size', 'Texts per batched embedding request',
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048)
+)
+EMBEDDING_FALLBACKS = registry.counter(
+    'ai_service_embedding_fallbacks_total', 'Switches to the fallback embedding backend after primary failures'
+)
+FEEDBACK_RETRIES = registry.counter('ai_service_feedback_retries_total', 'Feedback requests retried after transient errors')
+FEEDBACK_BATCH_ENTRIES = registry.counter(
+    'ai_service_feedback_batch_entries_total',
+    'Candidates in batched feedback requests, by whether the batch answered them validly', ['outcome']
+)
+FEEDBACK_FALLBACKS = registry.counter(
+    'ai_service_feedback_fallbacks_total', 'Canned feedback returned instead of model output', ['reason']
+)
+HTTP_REQUESTS = registry.counter('ai_service_http_requests_total', 'HTTP requests served', ['endpoint', 'method', 'status'])
+HTTP_REQUEST_SECONDS = registry.histogram('ai_service_http_request_seconds', 'HTTP request latency', ['endpoint'])
+
+
+def record_usage(operation, response):
+    """Count prompt/completion tokens from an API response's usage block, if any"""
+    usage = getattr(response, 'usage', None)
+    if usage is None and isinstance(response, dict):
+        usage = response.get('usage')
+    if usage is None:
+        return
+    for kind in ('prompt_tokens', 'completion_tokens'):
+        tokens = usage.get(kind) if isinstance(usage, dict) else getattr(usage, kind, None)
+        if tokens:
+            OPENAI_TOKENS.inc(tokens, operation=operation, kind=kind.split('_')[0])
+
+
+_active = threading.local()
+
+
+class RunTimer:
+    """Per-run stage timings, collected from any code running on this thread.
+
+    While a RunTimer is active (`with RunTimer() as timer:`), record_stage()
+    calls on the same thread add to it as well as to the stage histogram.
+    Stages are inclusive: 'db' time inside 'write' counts towards both.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.started = time.perf_counter()
+        self.seconds = None
+
+    def add(self, name, seconds):
+        stage = self.stages.setdefault(name, {'seconds': 0.0, 'count': 0})
+        stage['seconds'] += seconds
+        stage['count'] += 1
+
+    def summary(self):
+        elapsed = self.seconds if self.seconds is not None else time.perf_counter() - self.started
+        return {
+            'total_seconds': round(elapsed, 4),
+            'stages': {
+                name: {'seconds': round(stage['seconds'], 4), 'count': stage['count']}
+                for name, stage in sorted(self.stages.items())
+            }
+        }
+
+    def __enter__(self):
+        self._previous = getattr(_active, 'timer', None)
+        _active.timer = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.seconds = time.perf_counter() - self.started
+        _active.timer = self._previous
+        return False
+
+
+def record_stage(name, seconds):
+    STAGE_SECONDS.observe(seconds, stage=name)
+    timer = getattr(_active, 'timer', None)
+    if timer is not None:
+        timer.add(name, seconds)
+
+
+def record_run_stage(name, seconds):
+    """Add to this thread's RunTimer only, for work whose histogram sample is recorded on another thread"""
+    timer = getattr(_active, 'timer', None)
+    if timer is not None:
+        timer.add(name, seconds)
+
+
+@contextmanager
+def stage(name):
+    """Time a block as pipeline stage `name`"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - started)
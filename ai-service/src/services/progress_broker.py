@@ -0,0 +1,157 @@
+import queue
+import threading
+import time
+
+
+class ProgressBroker:
+    """Live ranking status per job, fanned out to Server-Sent Events subscribers.
+
+    Ranking runs publish status fields (status, progress, feedback_pending, ...)
+    which are merged into the job's in-memory state and pushed to every
+    subscriber of that job. States are trusted for `ttl_seconds` after their
+    last update; after that readers fall back to the database and prime()
+    the broker with the result. Embedded worker processes publish over a
+    multiprocessing queue drained by listen(); standalone workers only write
+    progress checkpoints to the database, which streams pick up by reloading
+    stale states.
+    """
+
+    TERMINAL_STATUSES = ('completed', 'failed', 'cancelled')
+
+    def __init__(self, ttl_seconds=10, subscriber_queue_size=100):
+        self.ttl_seconds = ttl_seconds
+        self.subscriber_queue_size = subscriber_queue_size
+        self._states = {}
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self.published = 0
+        self.dropped = 0
+
+    def _store(self, job_id, state):
+        state = dict(state)
+        with self._lock:
+            self._states[job_id] = (time.monotonic(), state)
+            subscribers = list(self._subscribers.get(job_id, ()))
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(state)
+            except queue.Full:
+                # A slow client only needs the latest state
+                self.dropped += 1
+                try:
+                    subscriber.get_nowait()
+                    subscriber.put_nowait(state)
+                except (queue.Empty, queue.Full):
+                    pass
+        return state
+
+    def publish(self, job_id, fields):
+        """Merge status fields into a job's state and notify subscribers"""
+        with self._lock:
+            entry = self._states.get(job_id)
+        self.published += 1
+        return self._store(job_id, {**(entry[1] if entry else {}), **fields})
+
+    def prime(self, job_id, state):
+        """Replace a job's state with one read from the database"""
+        return self._store(job_id, state)
+
+    def get(self, job_id):
+        """The job's state if it was updated within the TTL, otherwise None"""
+        with self._lock:
+            entry = self._states.get(job_id)
+        if entry and time.monotonic() - entry[0] < self.ttl_seconds:
+            return dict(entry[1])
+        return None
+
+    def subscribe(self, job_id):
+        subscriber = queue.Queue(maxsize=self.subscriber_queue_size)
+        with self._lock:
+            self._subscribers.setdefault(job_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, job_id, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(job_id)
+            if subscribers:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[job_id]
+
+    def is_finished(self, state):
+        """A run is finished once it stopped and has no feedback left to generate"""
+        return state.get('status') in self.TERMINAL_STATUSES and not state.get('feedback_pending')
+
+    def reload_stale(self, job_id, reload):
+        """Prime a job's state from `reload(job_id)` if it is older than the TTL; True if primed"""
+        if self.get(job_id) is not None:
+            return False
+        try:
+            state = reload(job_id)
+        except Exception as e:
+            print(f"⚠️ Failed to reload progress for job {job_id}: {e}")
+            return False
+        if not state:
+            return False
+        self.prime(job_id, state)
+        return True
+
+    def stream(self, job_id, initial_state, dumps, keepalive=15.0, reload=None):
+        """Server-Sent Events for a job: the current state, then every update.
+
+        Ends with a `done` event once the run is finished. Comment lines are
+        sent every `keepalive` seconds so proxies keep the connection open.
+        With `reload`, a state that received no update within the TTL is
+        re-read through `reload(job_id)`, so runs in processes that cannot
+        publish here (standalone workers) still progress and finish.
+        """
+        subscriber = self.subscribe(job_id)
+        wait = min(keepalive, max(self.ttl_seconds, 1.0)) if reload else keepalive
+        try:
+            state = initial_state
+            if state is not None:
+                yield f"event: progress\ndata: {dumps(state)}\n\n"
+            sent_state, sent_at = state, time.monotonic()
+            while state is None or not self.is_finished(state):
+                try:
+                    state = subscriber.get(timeout=wait)
+                except queue.Empty:
+                    # A reloaded state arrives through the subscriber queue
+                    if reload is not None and self.reload_stale(job_id, reload):
+                        continue
+                    if time.monotonic() - sent_at >= keepalive:
+                        yield ": keepalive\n\n"
+                        sent_at = time.monotonic()
+                    continue
+                if state == sent_state:
+                    continue
+                yield f"event: progress\ndata: {dumps(state)}\n\n"
+                sent_state, sent_at = state, time.monotonic()
+            yield f"event: done\ndata: {dumps(state)}\n\n"
+        finally:
+            self.unsubscribe(job_id, subscriber)
+
+    def listen(self, channel):
+        """Publish (job_id, fields) messages from a multiprocessing queue in a daemon thread"""
+        def pump():
+            while True:
+                try:
+                    job_id, fields = channel.get()
+                    self.publish(job_id, fields)
+                except (EOFError, OSError):
+                    return
+                except Exception as e:
+                    print(f"⚠️ Progress event dropped: {e}")
+
+        thread = threading.Thread(target=pump, name='progress-broker', daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self):
+        with self._lock:
+            return {
+                'jobs': len(self._states),
+                'subscribers': sum(len(subscribers) for subscribers in self._subscribers.values()),
+                'published': self.published,
+                'dropped': self.dropped
+            }
@@ -0,0 +1,182 @@
+import hashlib
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+
+VERSION_QUERY = """
+SELECT COUNT(*) AS count, MAX(ranked_at) AS ranked_at, SUM(total_score) AS score_sum
+FROM rankings
+WHERE job_id = %s
+"""
+
+
+def score_key(score):
+    """Scores are stored as DECIMAL(5,2); order on the stored precision"""
+    return round(float(score), 2)
+
+
+def rankings_version(database, job_id):
+    """Fingerprint of a job's stored rankings (row count, latest ranked_at and score sum)"""
+    row = database.execute_query(VERSION_QUERY, (job_id,))[0]
+    fingerprint = f"{row['count']}:{row['ranked_at']}:{row['score_sum']}"
+    return hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()[:16]
+
+
+class JobRankingIndex:
+    """Sorted score ordering of one job's rankings.
+
+    Entries are ordered by total score descending, then application ID
+    ascending, matching rank_position. Updates are O(log N) lookups plus a
+    list insert, and the index remembers the first position touched since it
+    was loaded so only positions from there on need to be re-checked.
+    """
+
+    LOAD_QUERY = """
+    SELECT application_id, total_score, rank_position
+    FROM rankings
+    WHERE job_id = %s
+    """
+
+    def __init__(self, job_id, entries=()):
+        self.job_id = job_id
+        self._keys = []
+        self._scores = {}
+        for application_id, score in entries:
+            self._scores[application_id] = score_key(score)
+        self._keys = sorted((-score, application_id) for application_id, score in self._scores.items())
+        self._dirty_from = len(self._keys)
+
+    @classmethod
+    def load(cls, database, job_id):
+        """Build the index from stored rankings; returns (index, stored positions)"""
+        rows = database.execute_query(cls.LOAD_QUERY, (job_id,))
+        index = cls(job_id, ((row['application_id'], row['total_score']) for row in rows))
+        positions = {row['application_id']: row['rank_position'] for row in rows}
+        # Positions already out of date in the database (e.g. legacy runs) count as touched
+        index._dirty_from = next(
+            (offset for offset, (_, application_id) in enumerate(index._keys)
+             if positions.get(application_id) != offset + 1),
+            len(index._keys)
+        )
+        return index, positions
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, application_id):
+        return application_id in self._scores
+
+    def score(self, application_id):
+        return self._scores.get(application_id)
+
+    def _mark(self, position):
+        self._dirty_from = min(self._dirty_from, position)
+
+    def remove(self, application_id):
+        score = self._scores.pop(application_id, None)
+        if score is None:
+            return
+        position = bisect_left(self._keys, (-score, application_id))
+        del self._keys[position]
+        self._mark(position)
+
+    def upsert(self, application_id, score):
+        """Insert or move an application to its position for `score`"""
+        score = score_key(score)
+        if self._scores.get(application_id) == score:
+            return
+        self.remove(application_id)
+        key = (-score, application_id)
+        self._mark(bisect_left(self._keys, key))
+        insort(self._keys, key)
+        self._scores[application_id] = score
+
+    def position(self, application_id):
+        """1-based rank position, or None if the application is not indexed"""
+        score = self._scores.get(application_id)
+        if score is None:
+            return None
+        return bisect_left(self._keys, (-score, application_id)) + 1
+
+    def positions(self):
+        """{application_id: 1-based position} for every indexed application"""
+        return {application_id: offset + 1 for offset, (_, application_id) in enumerate(self._keys)}
+
+    def page(self, limit, after=None, min_score=None, max_score=None):
+        """Up to `limit` (position, application_id, score) entries in rank order.
+
+        `after` is the (score, application_id) of the last entry of the
+        previous page; `min_score`/`max_score` bound the scores returned.
+        Both the cursor and the upper bound are binary searches.
+        """
+        start = 0
+        if max_score is not None:
+            start = bisect_left(self._keys, (-score_key(max_score),))
+        if after is not None:
+            start = max(start, bisect_right(self._keys, (-score_key(after[0]), after[1])))
+
+        entries = []
+        for offset in range(start, min(start + limit, len(self._keys))):
+            negative_score, application_id = self._keys[offset]
+            if min_score is not None and -negative_score < min_score:
+                break
+            entries.append((offset + 1, application_id, -negative_score))
+        return entries
+
+    def shifted_positions(self, stored_positions):
+        """(position, application_id) pairs whose stored rank_position is out of date.
+
+        Only entries at or after the first touched position are compared, and
+        clean entries are skipped, so a few arrivals near the bottom of a large
+        job produce only a handful of updates.
+        """
+        changes = []
+        for offset, (_, application_id) in enumerate(self._keys[self._dirty_from:]):
+            position = self._dirty_from + offset + 1
+            if stored_positions.get(application_id) != position:
+                changes.append((position, application_id))
+        return changes
+
+    def mark_clean(self):
+        self._dirty_from = len(self._keys)
+
+
+class JobRankingIndexCache:
+    """Jobs' ranking indexes kept in memory between ranking runs.
+
+    A run takes its job's index and puts it back once the positions it
+    computed are written, so a job's rankings are only read in full on its
+    first run in this process, or after they changed elsewhere (judged by
+    rankings_version). Taking removes the entry, so an index left
+    half-updated by a failed run is never reused.
+    """
+
+    def __init__(self, database, max_jobs=64):
+        self.db = database
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+
+    def take(self, job_id):
+        """(index, stored positions) for a job, from memory while its rankings are unchanged"""
+        with self._lock:
+            entry = self._jobs.pop(job_id, None)
+        if entry and rankings_version(self.db, job_id) == entry[1]:
+            self.hits += 1
+            return entry[0], entry[0].positions()
+        self.loads += 1
+        return JobRankingIndex.load(self.db, job_id)
+
+    def put(self, index):
+        """Keep a clean index whose positions match the database"""
+        version = rankings_version(self.db, index.job_id)
+        with self._lock:
+            self._jobs[index.job_id] = (index, version)
+            self._jobs.move_to_end(index.job_id)
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+
+    def stats(self):
+        return {'jobs': len(self._jobs), 'hits': self.hits, 'loads': self.loads}
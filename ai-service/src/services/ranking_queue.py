@@ -0,0 +1,244 @@
+import threading
+import time
+
+
+class JobNotFound(Exception):
+    """Raised when a ranking run is requested for a job that does not exist"""
+
+
+class RankingQueue:
+    """Durable ranking work queue stored in the processing_jobs table.
+
+    Jobs are enqueued as 'queued' rows and claimed by workers with
+    SELECT ... FOR UPDATE SKIP LOCKED, so any number of worker processes can
+    poll the table without handing the same job out twice. Workers refresh
+    heartbeat_at while running; rows whose heartbeat goes stale are requeued
+    (or failed once they exhaust max_attempts).
+    """
+
+    def __init__(self, database, stale_after=120, max_attempts=3):
+        self.db = database
+        self.stale_after = stale_after
+        self.max_attempts = max_attempts
+
+    def enqueue(self, job_id, priority=0):
+        """Queue a ranking run; returns the processing_jobs ID or None if one is already active
+
+        Raises JobNotFound if the job does not exist.
+        """
+        with self.db.transaction() as cursor:
+            # Lock the job row so concurrent requests for the same job serialize here
+            cursor.execute("SELECT id FROM jobs WHERE id = %s FOR UPDATE", (job_id,))
+            if not cursor.fetchone():
+                raise JobNotFound(f'Job {job_id} not found')
+
+            cursor.execute("""
+                SELECT id FROM processing_jobs
+                WHERE job_id = %s AND status IN ('queued', 'processing')
+                LIMIT 1
+            """, (job_id,))
+            if cursor.fetchone():
+                return None
+
+            cursor.execute("""
+                INSERT INTO processing_jobs (job_id, status, priority)
+                VALUES (%s, 'queued', %s)
+            """, (job_id, priority))
+            return cursor.lastrowid
+
+    def enqueue_many(self, job_ids, priority=0):
+        """Queue ranking runs for several jobs.
+
+        Returns {'queued': {job_id: processing_id}, 'active': [...], 'missing': [...]};
+        runs queued together are claimed together by batch workers.
+        """
+        result = {'queued': {}, 'active': [], 'missing': []}
+        # Sorted so concurrent batches lock job rows in the same order
+        for job_id in sorted(set(job_ids)):
+            try:
+                processing_id = self.enqueue(job_id, priority)
+            except JobNotFound:
+                result['missing'].append(job_id)
+                continue
+            if processing_id is None:
+                result['active'].append(job_id)
+            else:
+                result['queued'][job_id] = processing_id
+        return result
+
+    def claim_batch(self, worker_id, limit):
+        """Claim up to `limit` queued jobs in priority order; returns a possibly empty list"""
+        with self.db.transaction() as cursor:
+            cursor.execute("""
+                SELECT id, job_id, priority, attempts
+                FROM processing_jobs
+                WHERE status = 'queued'
+                ORDER BY priority DESC, created_at ASC, id ASC
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            """, (limit,))
+            jobs = cursor.fetchall()
+            if not jobs:
+                return []
+
+            placeholders = ', '.join(['%s'] * len(jobs))
+            cursor.execute(f"""
+                UPDATE processing_jobs
+                SET status = 'processing', worker_id = %s, attempts = attempts + 1,
+                    started_at = NOW(), heartbeat_at = NOW(), progress = 0,
+                    error_message = NULL, completed_at = NULL
+                WHERE id IN ({placeholders})
+            """, (worker_id, *[job['id'] for job in jobs]))
+            return jobs
+
+    def requeue(self, processing_id, reason):
+        """Put a claimed run back in the queue to start over; False once it is out of attempts
+
+        Rankings it already committed are kept (and skipped on the next
+        attempt unless they need rescoring), so its checkpoint count restarts,
+        as it does for runs requeued by recover_orphans.
+        """
+        return bool(self.db.execute_query("""
+            UPDATE processing_jobs
+            SET status = 'queued', worker_id = NULL, processed_candidates = 0, error_message = %s
+            WHERE id = %s AND status = 'processing' AND attempts < %s
+        """, (reason, processing_id, self.max_attempts)))
+
+    def request_cancel(self, job_id):
+        """Cancel a job's queued run outright and flag its running run to stop.
+
+        Returns {'cancelled': queued runs cancelled, 'cancelling': running runs flagged}.
+        """
+        cancelled = self.db.execute_query("""
+            UPDATE processing_jobs
+            SET status = 'cancelled', completed_at = NOW(), error_message = 'Cancelled by request'
+            WHERE job_id = %s AND status = 'queued'
+        """, (job_id,))
+        cancelling = self.db.execute_query("""
+            UPDATE processing_jobs
+            SET cancel_requested = 1
+            WHERE job_id = %s AND status = 'processing'
+        """, (job_id,))
+        return {'cancelled': cancelled, 'cancelling': cancelling}
+
+    def cancelled(self, processing_ids):
+        """IDs among `processing_ids` whose run was asked to stop"""
+        if not processing_ids:
+            return set()
+        placeholders = ', '.join(['%s'] * len(processing_ids))
+        rows = self.db.execute_query(f"""
+            SELECT id FROM processing_jobs
+            WHERE id IN ({placeholders}) AND cancel_requested = 1
+        """, tuple(processing_ids))
+        return {row['id'] for row in rows}
+
+    def heartbeat(self, processing_id):
+        self.db.execute_query("""
+            UPDATE processing_jobs SET heartbeat_at = NOW()
+            WHERE id = %s AND status = 'processing'
+        """, (processing_id,))
+
+    def recover_orphans(self):
+        """Requeue runs whose worker stopped heartbeating; fail those out of attempts.
+
+        Requeued runs resume from their last checkpoint, since rankings that
+        were already committed are not rescored; like requeue(), their
+        checkpoint count restarts with the remaining applications. Orphans that were asked to
+        stop are cancelled instead.
+        """
+        cancelled = self.db.execute_query("""
+            UPDATE processing_jobs
+            SET status = 'cancelled', completed_at = NOW(), worker_id = NULL,
+                error_message = 'Cancelled by request'
+            WHERE status = 'processing'
+              AND COALESCE(heartbeat_at, started_at, created_at) < NOW() - INTERVAL %s SECOND
+              AND cancel_requested = 1
+        """, (self.stale_after,))
+
+        failed = self.db.execute_query("""
+            UPDATE processing_jobs
+            SET status = 'failed', completed_at = NOW(), worker_id = NULL,
+                error_message = 'Worker stopped responding too many times'
+            WHERE status = 'processing'
+              AND COALESCE(heartbeat_at, started_at, created_at) < NOW() - INTERVAL %s SECOND
+              AND attempts >= %s
+        """, (self.stale_after, self.max_attempts))
+
+        requeued = self.db.execute_query("""
+            UPDATE processing_jobs
+            SET status = 'queued', worker_id = NULL, processed_candidates = 0
+            WHERE status = 'processing'
+              AND COALESCE(heartbeat_at, started_at, created_at) < NOW() - INTERVAL %s SECOND
+        """, (self.stale_after,))
+
+        return {'requeued': requeued, 'failed': failed, 'cancelled': cancelled}
+
+
+class RankingWorker:
+    """Polls a RankingQueue and runs claimed jobs through `process(job_id, processing_id)`.
+
+    With `process_batch` and a `batch_size` above 1, up to `batch_size` queued
+    jobs are claimed at once and handed to `process_batch([(job_id, processing_id), ...])`.
+    """
+
+    def __init__(self, queue, process, worker_id, poll_interval=2.0,
+                 heartbeat_interval=30.0, recover_interval=60.0, process_batch=None, batch_size=1):
+        self.queue = queue
+        self.process = process
+        self.process_batch = process_batch
+        self.batch_size = batch_size if process_batch else 1
+        self.worker_id = worker_id
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.recover_interval = recover_interval
+        self.stop_event = threading.Event()
+
+    def _heartbeat(self, processing_ids, done):
+        while not done.wait(self.heartbeat_interval):
+            for processing_id in processing_ids:
+                try:
+                    self.queue.heartbeat(processing_id)
+                except Exception as e:
+                    print(f"⚠️ Heartbeat failed for processing job {processing_id}: {e}")
+
+    def run_once(self):
+        """Claim and process queued jobs; returns False when the queue was empty"""
+        jobs = self.queue.claim_batch(self.worker_id, self.batch_size)
+        if not jobs:
+            return False
+
+        done = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat, args=([job['id'] for job in jobs], done), daemon=True
+        )
+        heartbeat.start()
+        try:
+            if len(jobs) > 1:
+                self.process_batch([(job['job_id'], job['id']) for job in jobs])
+            else:
+                self.process(jobs[0]['job_id'], jobs[0]['id'])
+        finally:
+            done.set()
+            heartbeat.join()
+        return True
+
+    def run(self):
+        print(f"👷 Ranking worker {self.worker_id} started")
+        last_recovery = 0.0
+        while not self.stop_event.is_set():
+            try:
+                if time.monotonic() - last_recovery >= self.recover_interval:
+                    recovered = self.queue.recover_orphans()
+                    if any(recovered.values()):
+                        print(f"♻️ Recovered orphaned ranking jobs: {recovered}")
+                    last_recovery = time.monotonic()
+
+                if not self.run_once():
+                    self.stop_event.wait(self.poll_interval)
+            except Exception as e:
+                print(f"❌ Ranking worker {self.worker_id} error: {e}")
+                self.stop_event.wait(self.poll_interval)
+        print(f"👷 Ranking worker {self.worker_id} stopped")
+
+    def stop(self):
+        self.stop_event.set()
@@ -0,0 +1,212 @@
+import json
+import time
+
+from services.metrics import stage
+
+
+class RankingWriter:
+    """Buffers ranking and feedback upserts and writes them in batches.
+
+    Each flush is one executemany per table inside a single transaction, so a run
+    costs O(N / batch_size) commits instead of one or more per candidate.
+    Buffers are also flushed once `max_delay` seconds have passed since the
+    last flush, so slow producers (LLM feedback) still become visible promptly.
+    An optional `checkpoint(cursor, rankings)` runs inside each flush
+    transaction, so run bookkeeping commits atomically with the rows it
+    describes. With `on_error(job_id, error)`, a flush of several jobs'
+    rankings that fails is retried one job per transaction and only the jobs
+    whose rows still fail are reported, instead of raising.
+    """
+
+    RANKING_QUERY = """
+    INSERT INTO rankings
+    (job_id, application_id, skill_score, education_score, experience_score, total_score, rank_position,
+     score_breakdown, resume_hash, requirements_hash, embedding_backend)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+    skill_score = VALUES(skill_score),
+    education_score = VALUES(education_score),
+    experience_score = VALUES(experience_score),
+    total_score = VALUES(total_score),
+    score_breakdown = VALUES(score_breakdown),
+    resume_hash = VALUES(resume_hash),
+    requirements_hash = VALUES(requirements_hash),
+    embedding_backend = VALUES(embedding_backend),
+    ranked_at = CURRENT_TIMESTAMP
+    """
+
+    FEEDBACK_QUERY = """
+    INSERT INTO feedback
+    (application_id, strengths, missing_skills, suggestions, overall_assessment)
+    VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+    strengths = VALUES(strengths),
+    missing_skills = VALUES(missing_skills),
+    suggestions = VALUES(suggestions),
+    overall_assessment = VALUES(overall_assessment),
+    generated_at = CURRENT_TIMESTAMP
+    """
+
+    # Shifted positions in one statement per chunk (executemany would send
+    # one UPDATE per row)
+    RANK_POSITIONS_QUERY = """
+    UPDATE rankings
+    SET rank_position = CASE application_id {cases} END
+    WHERE job_id = %s AND application_id IN ({placeholders})
+    """
+
+    RANK_POSITIONS_CHUNK_SIZE = 1000
+
+    def __init__(self, database, batch_size=200, max_delay=5.0, checkpoint=None, on_error=None):
+        self.db = database
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.checkpoint = checkpoint
+        self.on_error = on_error
+        self._rankings = []
+        self._feedback = []
+        self._last_flush = time.monotonic()
+
+    @staticmethod
+    def ranking_params(job_id, application_id, scores, resume_hash=None, requirements_hash=None,
+                       embedding_backend=None):
+        return (
+            job_id,
+            application_id,
+            scores['skill_score'],
+            scores['education_score'],
+            scores['experience_score'],
+            scores['total_score'],
+            0,  # Assigned by update_rank_positions
+            json.dumps(scores),
+            resume_hash,
+            requirements_hash,
+            embedding_backend
+        )
+
+    @staticmethod
+    def feedback_params(application_id, feedback):
+        return (
+            application_id,
+            feedback['strengths'],
+            feedback['missing_skills'],
+            feedback['suggestions'],
+            feedback['overall_assessment']
+        )
+
+    def add_ranking(self, job_id, application_id, scores, resume_hash=None, requirements_hash=None,
+                    embedding_backend=None):
+        self._rankings.append(self.ranking_params(
+            job_id, application_id, scores, resume_hash, requirements_hash, embedding_backend
+        ))
+        self._maybe_flush()
+
+    def add_feedback(self, application_id, feedback):
+        self._feedback.append(self.feedback_params(application_id, feedback))
+        self._maybe_flush()
+
+    def pending(self):
+        return len(self._rankings) + len(self._feedback)
+
+    def _maybe_flush(self):
+        if self.pending() >= self.batch_size or time.monotonic() - self._last_flush >= self.max_delay:
+            self.flush()
+
+    def _write(self, rankings, feedback):
+        with stage('write'), self.db.transaction() as cursor:
+            if rankings:
+                cursor.executemany(self.RANKING_QUERY, rankings)
+            if feedback:
+                cursor.executemany(self.FEEDBACK_QUERY, feedback)
+            if rankings and self.checkpoint:
+                self.checkpoint(cursor, rankings)
+
+    def flush(self):
+        """Write all buffered rows in one transaction"""
+        if self._rankings or self._feedback:
+            rankings, self._rankings = self._rankings, []
+            feedback, self._feedback = self._feedback, []
+            try:
+                self._write(rankings, feedback)
+            except Exception:
+                by_job = {}
+                for params in rankings:
+                    by_job.setdefault(params[0], []).append(params)
+                if self.on_error is None or not by_job:
+                    raise
+                self._write_per_job(by_job, feedback)
+        self._last_flush = time.monotonic()
+
+    def _write_per_job(self, by_job, feedback):
+        for job_id, rankings in by_job.items():
+            try:
+                self._write(rankings, [])
+            except Exception as e:
+                self.on_error(job_id, e)
+        if feedback:
+            self._write([], feedback)
+
+    def update_rank_positions(self, job_id, changes):
+        """Flush pending rankings and write only the (position, application_id) pairs that moved"""
+        self.flush()
+        if not changes:
+            return 0
+        with stage('rank_positions'), self.db.transaction() as cursor:
+            for start in range(0, len(changes), self.RANK_POSITIONS_CHUNK_SIZE):
+                chunk = changes[start:start + self.RANK_POSITIONS_CHUNK_SIZE]
+                query = self.RANK_POSITIONS_QUERY.format(
+                    cases=' '.join(['WHEN %s THEN %s'] * len(chunk)),
+                    placeholders=', '.join(['%s'] * len(chunk))
+                )
+                params = [value for position, application_id in chunk for value in (application_id, position)]
+                cursor.execute(query, (*params, job_id, *[application_id for _, application_id in chunk]))
+        return len(changes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+        return False
+
+
+class ProgressReporter:
+    """Publishes live progress and throttles processing_jobs progress writes.
+
+    Every percent change goes to `publish(fields)` (in memory, cheap); the
+    database is only written at checkpoints, when progress moved by
+    `min_step` percent or `min_interval` seconds passed.
+    """
+
+    QUERY = """
+    UPDATE processing_jobs
+    SET progress = %s
+    WHERE id = %s AND status = 'processing'
+    """
+
+    def __init__(self, database, processing_id, total, min_interval=2.0, min_step=5, publish=None):
+        self.db = database
+        self.processing_id = processing_id
+        self.total = total
+        self.min_interval = min_interval
+        self.min_step = min_step
+        self.publish = publish
+        self.reported = 0
+        self.published = 0
+        self._last_report = time.monotonic()
+
+    def update(self, completed):
+        """Record progress, writing it only when it moved enough or enough time passed"""
+        if not self.total:
+            return
+        progress = int((completed / self.total) * 100)
+        if self.publish and progress > self.published:
+            self.publish({'progress': progress})
+            self.published = progress
+        now = time.monotonic()
+        if progress - self.reported >= self.min_step or (
+            progress > self.reported and now - self._last_report >= self.min_interval
+        ):
+            self.db.execute_query(self.QUERY, (progress, self.processing_id))
+            self.reported = progress
+            self._last_report = now
@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import OrderedDict
+
+from services.ranking_index import JobRankingIndex, rankings_version
+
+
+class JobRankings:
+    """One job's rankings held in memory: a sorted score index plus row details"""
+
+    def __init__(self, job_id, rows, version):
+        self.job_id = job_id
+        self.rows = {row['application_id']: row for row in rows}
+        self.index = JobRankingIndex(job_id, ((row['application_id'], row['total_score']) for row in rows))
+        self.version = version
+        self.checked_at = time.monotonic()
+
+    def page(self, limit, after=None, min_score=None, max_score=None):
+        """Ranked rows for one page, with rank_position taken from the index"""
+        return [
+            {**self.rows[application_id], 'rank_position': position}
+            for position, application_id, _ in self.index.page(limit, after, min_score, max_score)
+        ]
+
+
+class RankingsCache:
+    """Per-job ranking leaderboards served from memory.
+
+    A job's rankings are loaded once and kept in a JobRankingIndex. Entries
+    are trusted for `revalidate_interval` seconds; after that a single
+    aggregate query (row count, latest ranked_at and score sum) tells whether
+    anything changed before the job is reloaded. Writers in the same process
+    call invalidate() after storing rankings; other processes' writes are
+    picked up by revalidation.
+    """
+
+    LOAD_QUERY = """
+    SELECT r.application_id, a.candidate_id, u.first_name, u.last_name,
+           r.skill_score, r.education_score, r.experience_score, r.total_score, r.ranked_at
+    FROM rankings r
+    JOIN applications a ON a.id = r.application_id
+    JOIN users u ON u.id = a.candidate_id
+    WHERE r.job_id = %s
+    """
+
+    def __init__(self, database, revalidate_interval=5, max_jobs=128):
+        self.db = database
+        self.revalidate_interval = revalidate_interval
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidations = 0
+        self.loads = 0
+
+    def _load(self, job_id, version):
+        rows = self.db.execute_query(self.LOAD_QUERY, (job_id,))
+        for row in rows:
+            for column in ('skill_score', 'education_score', 'experience_score', 'total_score'):
+                row[column] = float(row[column])
+            row['ranked_at'] = row['ranked_at'].isoformat() if row['ranked_at'] else None
+        return JobRankings(job_id, rows, version)
+
+    def get(self, job_id):
+        """Current JobRankings for a job, reading the database only when it may have changed"""
+        with self._lock:
+            entry = self._jobs.get(job_id)
+            if entry:
+                self._jobs.move_to_end(job_id)
+        if entry and time.monotonic() - entry.checked_at < self.revalidate_interval:
+            self.hits += 1
+            return entry
+
+        version = rankings_version(self.db, job_id)
+        if entry and entry.version == version:
+            self.revalidations += 1
+            entry.checked_at = time.monotonic()
+            return entry
+
+        self.loads += 1
+        entry = self._load(job_id, version)
+        with self._lock:
+            self._jobs[job_id] = entry
+            self._jobs.move_to_end(job_id)
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+        return entry
+
+    def invalidate(self, job_id):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def stats(self):
+        return {
+            'jobs': len(self._jobs),
+            'hits': self.hits,
+            'revalidations': self.revalidations,
+            'loads': self.loads
+        }
@@ -0,0 +1,129 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+
+# Exportable columns and the SQL that selects them, in default output order
+EXPORT_COLUMNS = {
+    'rank_position': 'r.rank_position',
+    'application_id': 'r.application_id',
+    'candidate_id': 'a.candidate_id',
+    'first_name': 'u.first_name',
+    'last_name': 'u.last_name',
+    'email': 'u.email',
+    'total_score': 'r.total_score',
+    'skill_score': 'r.skill_score',
+    'education_score': 'r.education_score',
+    'experience_score': 'r.experience_score',
+    'ranked_at': 'r.ranked_at',
+    'strengths': 'f.strengths',
+    'missing_skills': 'f.missing_skills',
+    'suggestions': 'f.suggestions',
+    'overall_assessment': 'f.overall_assessment',
+    'feedback_generated_at': 'f.generated_at'
+}
+
+EXPORT_QUERY = """
+SELECT {columns}
+FROM rankings r
+JOIN applications a ON a.id = r.application_id
+JOIN users u ON u.id = a.candidate_id
+LEFT JOIN feedback f ON f.application_id = r.application_id
+WHERE r.job_id = %s
+ORDER BY r.total_score DESC, r.application_id ASC
+"""
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8'
+}
+
+
+def select_columns(names=None):
+    """Validated column list from a comma-separated `columns` parameter; raises ValueError"""
+    if not names:
+        return list(EXPORT_COLUMNS)
+    columns = [name.strip() for name in names.split(',') if name.strip()]
+    unknown = [name for name in columns if name not in EXPORT_COLUMNS]
+    if unknown or not columns:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}" if unknown else 'No columns selected')
+    return list(dict.fromkeys(columns))
+
+
+def export_value(value):
+    """JSON/CSV friendly value: scores as numbers, timestamps as ISO 8601"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def ndjson_lines(rows, columns):
+    for row in rows:
+        yield json.dumps({column: export_value(row[column]) for column in columns}) + '\n'
+
+
+def csv_lines(rows, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def line(values):
+        writer.writerow(values)
+        text = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return text
+
+    yield line(columns)
+    for row in rows:
+        yield line(['' if row[column] is None else export_value(row[column]) for column in columns])
+
+
+def error_line(export_format, message):
+    """Last line of an export that failed midway, so the truncated file is recognizable"""
+    if export_format == 'csv':
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow([f'# export incomplete: {message}'])
+        return buffer.getvalue()
+    return json.dumps({'error': f'export incomplete: {message}'}) + '\n'
+
+
+def chunks(lines, size=64 * 1024):
+    """Group text lines into UTF-8 chunks of about `size` bytes"""
+    pending, length = [], 0
+    for line in lines:
+        data = line.encode('utf-8')
+        pending.append(data)
+        length += len(data)
+        if length >= size:
+            yield b''.join(pending)
+            pending, length = [], 0
+    if pending:
+        yield b''.join(pending)
+
+
+def gzip_chunks(data_chunks, level=6):
+    """Compress a stream of byte chunks into one gzip stream"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for data in data_chunks:
+        compressed = compressor.compress(data)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def stream_rankings(database, job_id, columns, export_format='ndjson', compress=False, fetch_size=1000):
+    """Byte chunks of a job's rankings, feedback and candidate identity, best first.
+
+    Rows come from Database.stream (an unbuffered cursor) and are encoded and
+    optionally gzipped as they arrive, so memory use does not grow with the
+    number of rankings.
+    """
+    query = EXPORT_QUERY.format(columns=', '.join(f"{EXPORT_COLUMNS[column]} AS {column}" for column in columns))
+    rows = database.stream(query, (job_id,), batch_size=fetch_size)
+    lines = csv_lines(rows, columns) if export_format == 'csv' else ndjson_lines(rows, columns)
+    data = chunks(lines)
+    return gzip_chunks(data) if compress else data
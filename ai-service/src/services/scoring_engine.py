@@ -0,0 +1,262 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from services.skill_vocabulary import CandidateSkills, SkillVocabulary
+
+# Field-of-study tiers used by AIService.calculate_education_match
+PRIMARY_FIELD_PATTERN = re.compile('|'.join(
+    re.escape(keyword) for keyword in ['computer science', 'software engineering', 'information technology']
+))
+SECONDARY_FIELD_PATTERN = re.compile('|'.join(
+    re.escape(keyword) for keyword in ['engineering', 'science']
+))
+
+
+def _lower(value):
+    return (value or '').lower()
+
+
+class JobProfile:
+    """A job's requirements compiled once for batch scoring.
+
+    Holds the required skills as IDs in the global skill vocabulary,
+    precompiled degree/field/role matchers and the experience thresholds.
+    Matcher results are memoized per distinct degree, field and title string,
+    since most applicants share them.
+    """
+
+    def __init__(self, job_data, vocabulary, skill_vectors=None):
+        self.job_data = job_data
+
+        # Semantic matching: the SkillVectorVocabulary pinned for a ranking
+        # run, or None to use whichever backend is healthy per batch
+        self.skill_vectors = skill_vectors
+
+        # Skills: interned IDs, sorted and as a set for overlaps. The keyword
+        # score divides by the full list length, duplicates included.
+        self.required_skills = list(job_data.get('required_skills') or [])
+        self.required_ids = vocabulary.id_array(self.required_skills)
+        self.required_id_set = frozenset(self.required_ids)
+        self.required_skill_count = len(self.required_skills)
+
+        # Education: one bit per required entry, in order
+        self.required_education = [education.lower() for education in job_data.get('required_education') or []]
+        self.degree_patterns = [re.compile(re.escape(education)) for education in self.required_education]
+        self._degree_masks = {}
+        self._field_bonus = {}
+
+        # Experience: thresholds and a single matcher for all preferred-role keywords
+        required_experience = job_data.get('required_experience') or {}
+        self.has_experience_requirements = bool(required_experience)
+        self.min_years = required_experience.get('min_years', 0)
+        preferred_roles = required_experience.get('preferred_roles', [])
+        self.has_preferred_roles = bool(preferred_roles)
+        keywords = [keyword for role in preferred_roles for keyword in role.lower().split()]
+        self.role_pattern = re.compile('|'.join(re.escape(keyword) for keyword in keywords)) if keywords else None
+        self._title_matches = {}
+
+    def degree_mask(self, degree):
+        """Bitmask of required education entries matched by a candidate degree"""
+        mask = self._degree_masks.get(degree)
+        if mask is None:
+            mask = 0
+            for position, (education, pattern) in enumerate(zip(self.required_education, self.degree_patterns)):
+                if pattern.search(degree) or degree in education:
+                    mask |= 1 << position
+            self._degree_masks[degree] = mask
+        return mask
+
+    def field_bonus(self, field):
+        """Points a field of study adds per required education entry (30, 20 or 0)"""
+        bonus = self._field_bonus.get(field)
+        if bonus is None:
+            if PRIMARY_FIELD_PATTERN.search(field):
+                bonus = 30
+            elif SECONDARY_FIELD_PATTERN.search(field):
+                bonus = 20
+            else:
+                bonus = 0
+            self._field_bonus[field] = bonus
+        return bonus
+
+    def title_matches(self, title):
+        matched = self._title_matches.get(title)
+        if matched is None:
+            matched = bool(self.role_pattern and self.role_pattern.search(title))
+            self._title_matches[title] = matched
+        return matched
+
+
+class ScoringEngine:
+    """Scores a batch of candidates against a compiled JobProfile with NumPy.
+
+    Produces the same skill, education, experience and 40/30/30 total scores
+    as AIService's per-candidate calculate_*_match functions.
+    """
+
+    def __init__(self, ai_service, vocabulary=None):
+        self.ai_service = ai_service
+        self.vocabulary = vocabulary or SkillVocabulary()
+
+    def compile(self, job_data, skill_vectors=None):
+        return JobProfile(job_data, self.vocabulary, skill_vectors)
+
+    def skill_record(self, candidate):
+        """Compact CandidateSkills for a candidate, built once and kept on the candidate dict"""
+        record = candidate.get('skill_record')
+        if record is None:
+            record = CandidateSkills.from_rows(self.vocabulary, candidate.get('skills') or [])
+            candidate['skill_record'] = record
+        return record
+
+    def score_batch(self, profile, candidates, semantic_scores=None, skill_vectors=None):
+        """Score candidate data dicts; returns a dict of per-component score arrays
+
+        `skill_vectors` overrides the profile's SkillVectorVocabulary for
+        semantic matching.
+        """
+        if skill_vectors is None:
+            skill_vectors = profile.skill_vectors
+        count = len(candidates)
+
+        has_skills = np.zeros(count, dtype=bool)
+        keyword_matches = np.zeros(count)
+        has_education = np.zeros(count, dtype=bool)
+        degree_matches = np.zeros(count)
+        field_bonus = np.zeros(count)
+        has_experience = np.zeros(count, dtype=bool)
+        total_months = np.zeros(count)
+        role_matched = np.zeros(count, dtype=bool)
+
+        for position, candidate in enumerate(candidates):
+            record = self.skill_record(candidate)
+            if record.count:
+                has_skills[position] = True
+                keyword_matches[position] = record.overlap(profile.required_id_set)
+
+            education = candidate.get('education') or []
+            if education:
+                has_education[position] = True
+                mask = 0
+                for entry in education:
+                    mask |= profile.degree_mask(_lower(entry.get('degree')))
+                degree_matches[position] = mask.bit_count()
+                for entry in education:
+                    bonus = profile.field_bonus(_lower(entry.get('field_of_study')))
+                    if bonus:
+                        field_bonus[position] = bonus
+                        break
+
+            experience = candidate.get('experience') or []
+            if experience:
+                has_experience[position] = True
+                total_months[position] = sum(entry.get('duration_months', 0) for entry in experience)
+                role_matched[position] = any(
+                    profile.title_matches(_lower(entry.get('job_title'))) for entry in experience
+                )
+
+        # Skills: 70% keyword coverage, 30% semantic (100 when every keyword matched)
+        if profile.required_skill_count:
+            keyword_score = (keyword_matches / profile.required_skill_count) * 100
+            needs_semantic = has_skills & (keyword_matches < profile.required_skill_count)
+            if semantic_scores is None:
+                semantic_scores = np.zeros(count)
+                if needs_semantic.any():
+                    positions = np.flatnonzero(needs_semantic)
+                    semantic_scores[positions] = self.ai_service.calculate_semantic_skill_scores(
+                        [candidates[position]['skills'] for position in positions],
+                        profile.required_skills,
+                        vocabulary=skill_vectors
+                    )
+            semantic = np.where(needs_semantic, np.asarray(semantic_scores, dtype=float), 100.0)
+            skill_score = np.minimum((keyword_score * 0.7) + (semantic * 0.3), 100.0)
+            skill_score = np.where(has_skills, skill_score, 0.0)
+        else:
+            skill_score = np.zeros(count)
+
+        # Education: 50 per matched required degree plus the field bonus per requirement
+        if profile.required_education:
+            education_score = np.minimum(
+                degree_matches * 50 + field_bonus * len(profile.required_education), 100.0
+            )
+            education_score = np.where(has_education, education_score, 0.0)
+        else:
+            education_score = np.zeros(count)
+
+        # Experience: 60% years against the minimum, 40% preferred-role relevance
+        if profile.has_experience_requirements:
+            if profile.min_years > 0:
+                years_score = np.minimum((total_months / 12 / profile.min_years) * 100, 100)
+            else:
+                years_score = np.full(count, 50.0)
+            if profile.has_preferred_roles:
+                role_score = np.where(role_matched, 50.0, 0.0)
+            else:
+                role_score = np.full(count, 50.0)
+            experience_score = np.where(has_experience, (years_score * 0.6) + (role_score * 0.4), 0.0)
+        else:
+            experience_score = np.zeros(count)
+
+        # Total score (40% skills, 30% education, 30% experience)
+        total_score = (skill_score * 0.4) + (education_score * 0.3) + (experience_score * 0.3)
+
+        return {
+            'skill_score': skill_score,
+            'education_score': education_score,
+            'experience_score': experience_score,
+            'total_score': total_score
+        }
+
+
+class JobProfileCache:
+    """LRU of compiled job profiles with a short TTL.
+
+    Lets single-application scoring skip re-reading and re-compiling a job's
+    requirements on every request. `load_job(job_id)` returns job data (with
+    decoded JSON requirement columns) or None.
+    """
+
+    def __init__(self, engine, load_job, max_entries=256, ttl_seconds=60):
+        self.engine = engine
+        self.load_job = load_job
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, job_id):
+        """Compiled profile for a job, or None if the job does not exist"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._profiles.get(job_id)
+            if entry and now - entry[0] < self.ttl_seconds:
+                self._profiles.move_to_end(job_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        job_data = self.load_job(job_id)
+        if not job_data:
+            return None
+        profile = self.engine.compile(job_data)
+
+        with self._lock:
+            self._profiles[job_id] = (now, profile)
+            self._profiles.move_to_end(job_id)
+            while len(self._profiles) > self.max_entries:
+                self._profiles.popitem(last=False)
+        return profile
+
+    def invalidate(self, job_id):
+        with self._lock:
+            self._profiles.pop(job_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._profiles), 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,165 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from services.embedding_cache import normalize_text
+
+
+class EmbeddingUnavailable(Exception):
+    """Skill names could not be embedded by a vocabulary that must not skip them"""
+
+
+class SkillVectorVocabulary:
+    """Embeds each distinct skill name once and keeps the vectors in a
+    row-normalized matrix.
+
+    Semantic matching for a job is then a single (candidate skills x required
+    skills) matrix product, max-pooled per required skill, instead of one
+    embedding call and one 1x1 cosine similarity per candidate.
+
+    The matrix is preallocated and doubles in size when full. At most
+    `max_entries` skills are kept: when new ones would exceed that, the most
+    recently used are copied into a fresh matrix and the rest dropped (they
+    are re-embedded, usually from the embedding cache, if seen again).
+    lookup() hands out row IDs together with the matrix they index, so
+    callers are unaffected by a concurrent eviction.
+    """
+
+    def __init__(self, embed, name=None, max_entries=20000):
+        # embed(texts) returns one vector (or None on failure) per text
+        self.embed = embed
+        self.name = name
+        self.max_entries = max_entries
+        # Normalized name -> matrix row, least recently used first
+        self._rows = OrderedDict()
+        self._matrix = None
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _ensure_capacity(self, dim, size):
+        if self._matrix is None:
+            self._matrix = np.zeros((max(16, size), dim), dtype=np.float32)
+        elif size > self._matrix.shape[0]:
+            matrix = np.zeros((max(self._matrix.shape[0] * 2, size), dim), dtype=np.float32)
+            matrix[:len(self._rows)] = self._matrix[:len(self._rows)]
+            self._matrix = matrix
+
+    def _evict(self, keep):
+        """Keep the `keep` most recently used skills, renumbered into a new matrix"""
+        kept = list(self._rows.items())[len(self._rows) - keep:] if keep else []
+        matrix = np.zeros((max(16, len(kept) * 2), self._matrix.shape[1]), dtype=np.float32)
+        if kept:
+            matrix[:len(kept)] = self._matrix[np.array([row for _, row in kept])]
+        self.evictions += len(self._rows) - len(kept)
+        self._rows = OrderedDict((key, row) for row, (key, _) in enumerate(kept))
+        self._matrix = matrix
+
+    def lookup(self, names, strict=False):
+        """Row IDs for skill names and the matrix they index, embedding unknown names.
+
+        All new names are embedded in one batched call. Names that are empty
+        or fail to embed map to -1 and are retried on the next call; with
+        `strict`, a failed embedding raises EmbeddingUnavailable instead.
+        """
+        keys = [normalize_text(name) for name in names]
+        with self._lock:
+            unknown = list(dict.fromkeys(key for key in keys if key and key not in self._rows))
+
+        vectors = self.embed(unknown) if unknown else []
+        with self._lock:
+            requested = set(key for key in keys if key in self._rows)
+            for key in requested:
+                self._rows.move_to_end(key)
+
+            failed = []
+            new = {}
+            for key, vector in zip(unknown, vectors):
+                if vector is None:
+                    failed.append(key)
+                elif key not in self._rows:
+                    vector = np.asarray(vector, dtype=np.float32)
+                    norm = np.linalg.norm(vector)
+                    new[key] = vector / norm if norm else vector
+            if strict and failed:
+                raise EmbeddingUnavailable(f"{self.name or 'Embedding backend'} failed to embed {len(failed)} skill(s)")
+
+            if new:
+                if self._matrix is not None and len(self._rows) + len(new) > self.max_entries:
+                    # Skills of this lookup are the most recently used, so they survive
+                    self._evict(max(min(self.max_entries // 2, self.max_entries - len(new)), len(requested)))
+                self._ensure_capacity(len(next(iter(new.values()))), len(self._rows) + len(new))
+                for key, vector in new.items():
+                    row = len(self._rows)
+                    self._matrix[row] = vector
+                    self._rows[key] = row
+
+            rows = [self._rows.get(key, -1) if key else -1 for key in keys]
+            return rows, self._snapshot()
+
+    def _snapshot(self):
+        if self._matrix is None:
+            return np.zeros((0, 0), dtype=np.float32)
+        # Rows are only ever appended past this view or copied to a new matrix
+        return self._matrix[:len(self._rows)]
+
+    def contains(self, names):
+        """True if every non-empty name is already embedded (scoring them needs no backend call)"""
+        with self._lock:
+            return all(key in self._rows for key in map(normalize_text, names) if key)
+
+    def centroid(self, names):
+        """Normalized mean vector of a set of skills, or None if none could be embedded"""
+        rows, matrix = self.lookup(names)
+        rows = [row for row in rows if row >= 0]
+        if not rows:
+            return None
+        vector = matrix[np.array(rows)].mean(axis=0)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def match_scores(self, candidates_skill_names, required_skill_names, strict=False):
+        """Semantic skill scores (0-100) for many candidates against one job.
+
+        For every required skill the best-matching candidate skill is taken
+        (max-pooling), and the per-requirement similarities are averaged.
+        With `strict`, skills that fail to embed raise EmbeddingUnavailable
+        rather than being left out of the scores.
+        """
+        scores = np.zeros(len(candidates_skill_names))
+        required_skill_names = list(required_skill_names)
+        if not len(candidates_skill_names) or not required_skill_names:
+            return scores
+
+        # The job's and every candidate's new skills are embedded in one batch
+        all_names = [name for names in candidates_skill_names for name in names]
+        rows, matrix = self.lookup(required_skill_names + all_names, strict=strict)
+        required_rows = np.array(rows[:len(required_skill_names)], dtype=np.int64)
+        all_rows = rows[len(required_skill_names):]
+        skill_rows = []
+        owners = []
+        offset = 0
+        for position, names in enumerate(candidates_skill_names):
+            for row in all_rows[offset:offset + len(names)]:
+                if row >= 0:
+                    skill_rows.append(row)
+                    owners.append(position)
+            offset += len(names)
+        if not skill_rows:
+            return scores
+
+        known = required_rows >= 0
+        required = np.zeros((len(required_rows), matrix.shape[1]), dtype=np.float32)
+        required[known] = matrix[required_rows[known]]
+
+        # (all candidates' skills x required skills) in one product
+        similarity = matrix[np.array(skill_rows)] @ required.T
+
+        # Max-pool per candidate and required skill; negatives count as no match
+        pooled = np.zeros((len(candidates_skill_names), len(required_rows)), dtype=np.float32)
+        np.maximum.at(pooled, np.array(owners), similarity)
+
+        return np.clip(pooled.mean(axis=1), 0.0, 1.0) * 100
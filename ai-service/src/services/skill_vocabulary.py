@@ -0,0 +1,88 @@
+import json
+import threading
+from array import array
+
+
+class SkillVocabulary:
+    """Global mapping of normalized skill names and aliases to integer IDs.
+
+    Names are normalized the same way the scorers compare them (lowercased);
+    an alias resolves to its canonical skill's ID. Sets of skills are then
+    represented as sorted arrays of 4-byte IDs, whose size does not depend
+    on how large the vocabulary grows.
+    """
+
+    def __init__(self, aliases=None):
+        self._ids = {}
+        self._names = []
+        self._lock = threading.Lock()
+        for alias, canonical in (aliases or {}).items():
+            self.add_alias(alias, canonical)
+
+    @staticmethod
+    def normalize(name):
+        return (name or '').lower()
+
+    @staticmethod
+    def load_aliases(path):
+        """Read an {"alias": "canonical"} JSON file; a missing path means no aliases"""
+        if not path:
+            return {}
+        with open(path) as alias_file:
+            return json.load(alias_file)
+
+    def __len__(self):
+        return len(self._names)
+
+    def intern(self, name):
+        """ID for a skill name, assigning a new one if the name is unknown"""
+        key = self.normalize(name)
+        skill_id = self._ids.get(key)
+        if skill_id is None:
+            with self._lock:
+                skill_id = self._ids.get(key)
+                if skill_id is None:
+                    skill_id = len(self._names)
+                    self._names.append(key)
+                    self._ids[key] = skill_id
+        return skill_id
+
+    def lookup(self, name):
+        """ID for a known skill name or alias, or None"""
+        return self._ids.get(self.normalize(name))
+
+    def add_alias(self, alias, canonical):
+        skill_id = self.intern(canonical)
+        with self._lock:
+            self._ids[self.normalize(alias)] = skill_id
+        return skill_id
+
+    def name(self, skill_id):
+        return self._names[skill_id]
+
+    def id_array(self, names):
+        """Sorted array of the distinct interned IDs for `names`"""
+        return array('I', sorted({self.intern(name) for name in names}))
+
+
+class CandidateSkills:
+    """Compact per-candidate skill record: a sorted array of vocabulary IDs"""
+
+    __slots__ = ('ids', 'count')
+
+    def __init__(self, ids, count):
+        self.ids = ids
+        self.count = count
+
+    @classmethod
+    def from_rows(cls, vocabulary, skill_rows):
+        """Build from skills table rows (dicts with 'skill_name')"""
+        ids = vocabulary.id_array(row.get('skill_name') for row in skill_rows)
+        return cls(ids, len(skill_rows))
+
+    def overlap(self, required_ids):
+        """Number of distinct required skills (a set of IDs) this candidate has"""
+        return sum(1 for skill_id in self.ids if skill_id in required_ids)
+
+    def __bool__(self):
+        return self.count > 0
@@ -0,0 +1,106 @@
+"""Ranking queue workers
+
+Runs RANKING_WORKER_PROCESSES (or --processes) worker processes that claim
+queued ranking runs from processing_jobs and process them. With
+--metrics-port the workers' combined Prometheus metrics are served on
+http://<host>:<port>/metrics.
+
+    python worker.py --processes 4 --metrics-port 9101
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+
+def run_worker(index, events=None, metrics=None):
+    """Entry point for one worker process"""
+    # Imported here so every process opens its own database pool
+    import app
+    from services.metrics import registry
+    from services.ranking_queue import RankingWorker
+
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{index}"
+
+    # Live progress goes to the parent's broker when it handed us a queue
+    app.progress_channel = events
+
+    # So do metrics, as periodic snapshots merged into the parent's registry
+    if metrics is not None:
+        registry.push_periodically(metrics, worker_id, float(os.getenv('METRICS_PUSH_SECONDS', '5')))
+
+    worker = RankingWorker(
+        app.ranking_queue,
+        app.process_ranking,
+        worker_id=worker_id,
+        poll_interval=float(os.getenv('RANKING_POLL_INTERVAL', '2')),
+        process_batch=app.process_ranking_batch,
+        batch_size=int(os.getenv('RANKING_BATCH_JOBS', '8'))
+    )
+    signal.signal(signal.SIGTERM, lambda signum, frame: worker.stop())
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        worker.stop()
+
+
+def progress_queue():
+    """Queue for worker processes to publish live progress (or metrics) to the parent"""
+    return multiprocessing.get_context('spawn').Queue(maxsize=10000)
+
+
+def start_workers(count, events=None, metrics=None):
+    """Start `count` worker processes and return them"""
+    context = multiprocessing.get_context('spawn')
+    processes = []
+    for index in range(count):
+        process = context.Process(
+            target=run_worker, args=(index, events, metrics), name=f'ranking-worker-{index}', daemon=True
+        )
+        process.start()
+        processes.append(process)
+    return processes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run ranking queue workers')
+    parser.add_argument(
+        '--processes',
+        type=int,
+        default=int(os.getenv('RANKING_WORKER_PROCESSES', '2')),
+        help='number of worker processes'
+    )
+    parser.add_argument(
+        '--metrics-port',
+        type=int,
+        default=int(os.getenv('RANKING_WORKER_METRICS_PORT', '0')),
+        help='serve Prometheus metrics on this port (0 disables)'
+    )
+    args = parser.parse_args()
+
+    metrics = None
+    if args.metrics_port:
+        from services.metrics import registry
+        metrics = progress_queue()
+        registry.listen(metrics)
+        registry.serve(args.metrics_port)
+        print(f"📈 Worker metrics on port {args.metrics_port}")
+
+    print(f"👷 Starting {args.processes} ranking worker process(es)")
+    processes = start_workers(args.processes, metrics=metrics)
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,10 @@
+-- Durable ranking queue on processing_jobs
+-- Apply to databases created before the queue columns were added to schema.sql
+USE resume_screening;
+
+ALTER TABLE processing_jobs
+    ADD COLUMN priority INT NOT NULL DEFAULT 0 AFTER status,
+    ADD COLUMN attempts INT NOT NULL DEFAULT 0 AFTER priority,
+    ADD COLUMN worker_id VARCHAR(255) NULL AFTER attempts,
+    ADD COLUMN heartbeat_at TIMESTAMP NULL AFTER started_at,
+    ADD INDEX idx_queue (status, priority, created_at);
@@ -0,0 +1,7 @@
+-- Incremental re-ranking: remember which resume and job requirements each ranking was scored against
+-- Existing rankings keep NULL hashes and are rescored once on the next run
+USE resume_screening;
+
+ALTER TABLE rankings
+    ADD COLUMN resume_hash VARCHAR(64) NULL AFTER score_breakdown,
+    ADD COLUMN requirements_hash VARCHAR(64) NULL AFTER resume_hash;
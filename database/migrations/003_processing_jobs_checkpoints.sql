@@ -0,0 +1,9 @@
+-- Checkpointed, resumable and cancellable ranking runs
+-- processed_candidates/checkpoint_at are written in the same transaction as each batch of rankings
+USE resume_screening;
+
+ALTER TABLE processing_jobs
+    MODIFY COLUMN status ENUM('queued', 'processing', 'completed', 'failed', 'cancelled') DEFAULT 'queued',
+    ADD COLUMN cancel_requested TINYINT(1) NOT NULL DEFAULT 0 AFTER worker_id,
+    ADD COLUMN processed_candidates INT NOT NULL DEFAULT 0 AFTER total_candidates,
+    ADD COLUMN checkpoint_at TIMESTAMP NULL AFTER heartbeat_at;
@@ -0,0 +1,5 @@
+-- Per-run stage timings (seconds per pipeline stage), written when a ranking run ends
+USE resume_screening;
+
+ALTER TABLE processing_jobs
+    ADD COLUMN timings JSON NULL AFTER error_message;
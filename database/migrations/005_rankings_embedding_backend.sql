@@ -0,0 +1,6 @@
+-- Remember which embedding backend scored each ranking's semantic skill match
+-- Rankings scored on the fallback backend (or before this migration) are rescored on the next run
+USE resume_screening;
+
+ALTER TABLE rankings
+    ADD COLUMN embedding_backend VARCHAR(100) NULL AFTER requirements_hash;
@@ -137,6 +137,9 @@ CREATE TABLE rankings (
     total_score DECIMAL(5,2) NOT NULL DEFAULT 0.00,
     rank_position INT NOT NULL,
     score_breakdown JSON NULL,
+    resume_hash VARCHAR(64) NULL,
+    requirements_hash VARCHAR(64) NULL,
+    embedding_backend VARCHAR(100) NULL,
     ranked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (job_id) REFERENCES jobs(id) ON DELETE CASCADE,
     FOREIGN KEY (application_id) REFERENCES applications(id) ON DELETE CASCADE,
@@ -168,16 +171,25 @@ CREATE TABLE feedback (
 CREATE TABLE processing_jobs (
     id INT AUTO_INCREMENT PRIMARY KEY,
     job_id INT NOT NULL,
-    status ENUM('queued', 'processing', 'completed', 'failed') DEFAULT 'queued',
+    status ENUM('queued', 'processing', 'completed', 'failed', 'cancelled') DEFAULT 'queued',
+    priority INT NOT NULL DEFAULT 0,
+    attempts INT NOT NULL DEFAULT 0,
+    worker_id VARCHAR(255) NULL,
+    cancel_requested TINYINT(1) NOT NULL DEFAULT 0,
     progress INT DEFAULT 0,
     total_candidates INT DEFAULT 0,
+    processed_candidates INT NOT NULL DEFAULT 0,
     error_message TEXT NULL,
+    timings JSON NULL,
     started_at TIMESTAMP NULL,
+    heartbeat_at TIMESTAMP NULL,
+    checkpoint_at TIMESTAMP NULL,
     completed_at TIMESTAMP NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (job_id) REFERENCES jobs(id) ON DELETE CASCADE,
     INDEX idx_job (job_id),
-    INDEX idx_status (status)
+    INDEX idx_status (status),
+    INDEX idx_queue (status, priority, created_at)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- ============================================